@@ -1,8 +1,8 @@
 import os
-import whisper
-from pydub import AudioSegment
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 import torch
-import shutil
+from timestamps import fmt
+from tools import ensure_ffmpeg, iter_audio, load_audio
 import threading
 import queue
 import tkinter as tk
@@ -13,13 +13,23 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"使用設備: {device}")
 
 # 檢查 ffmpeg 和 ffprobe 是否在 PATH 中
-if shutil.which("ffmpeg") is None:
-    raise RuntimeError("找不到 ffmpeg 在 PATH 中")
-if shutil.which("ffprobe") is None:
-    raise RuntimeError("找不到 ffprobe 在 PATH 中")
+ensure_ffmpeg()
 
 # 初始化 Whisper 模型，並指定設備（GPU 或 CPU）
-model = whisper.load_model("base", device=device)
+# 使用 faster-whisper (CTranslate2)，GPU 用 int8_float16，CPU 用 int8 量化
+# Ampere 及以上的 GPU 啟用 FlashAttention-2 自注意力
+use_flash_attention = device == "cuda" and torch.cuda.get_device_capability()[0] >= 8
+compute_type = "int8_float16" if device == "cuda" else "int8"
+# 標準 CTranslate2 wheel 未編譯 FlashAttention 內核時退回一般注意力
+try:
+    model = WhisperModel("base", device=device, compute_type=compute_type, flash_attention=use_flash_attention)
+except (RuntimeError, ValueError):
+    if not use_flash_attention:
+        raise
+    model = WhisperModel("base", device=device, compute_type=compute_type)
+# 批次推論：同一檔案的多個音訊片段一次送入編碼器/解碼器
+batched_model = BatchedInferencePipeline(model=model)
+BATCH_SIZE = 8
 
 # 創建主窗口
 root = tk.Tk()
@@ -33,75 +43,62 @@ text_log.pack(expand=True, fill='both')
 # 創建一個階階，用於線程間通信
 log_queue = queue.Queue()
 
-# 時間格式轉換函數
-def format_timestamp(seconds):
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    seconds = int(seconds)
-    minutes = seconds // 60
-    seconds = seconds % 60
-    hours = minutes // 60
-    minutes = minutes % 60
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+# 寫入日志並通知 UI 線程（有新訊息時才喚醒事件循環）
+def log(msg):
+    log_queue.put(msg)
+    try:
+        root.event_generate("<<LogAvailable>>", when="tail")
+    except (RuntimeError, tk.TclError):
+        pass  # 視窗已關閉；繼續處理剩餘檔案，只是不再顯示日志
 
 # 日志更新函數
-def update_log():
+def drain_log_queue():
+    text_log.configure(state='normal')
     while not log_queue.empty():
         msg = log_queue.get_nowait()
-        text_log.configure(state='normal')
         text_log.insert('end', msg + '\n')
-        text_log.configure(state='disabled')
-        text_log.see('end')  # 自動滾動到底部
-    root.after(100, update_log)
+    text_log.configure(state='disabled')
+    text_log.see('end')  # 自動滾動到底部
 
 # 後台處理函數
 def process_files(root_audio_dir):
-    # 遞歷處理目錄及其子目錄中的所有音頻檔案
-    for root_dir, dirs, files in os.walk(root_audio_dir):
-        for filename in files:
-            if filename.endswith((".mp3", ".wav", ".m4a")):
-                audio_path = os.path.join(root_dir, filename)
-                log_queue.put(f"正在處理: {audio_path}")
-
-                try:
-                    # 將音頻檔案轉換為 WAV 格式（如果不是 WAV 格式）
-                    if not filename.endswith(".wav"):
-                        audio = AudioSegment.from_file(audio_path)
-                        # 臨時 WAV 檔案路徑
-                        wav_path = os.path.join(root_dir, f"{os.path.splitext(filename)[0]}.wav")
-                        audio.export(wav_path, format="wav")
-                    else:
-                        wav_path = audio_path
-
-                    # 使用 Whisper 模型轉錄音頻
-                    result = model.transcribe(wav_path)
-
-                    # 將轉錄文本保存到 .srt 檔案，與源檔案在同一目錄
-                    srt_path = os.path.join(root_dir, f"{os.path.splitext(filename)[0]}.srt")
-                    with open(srt_path, "w", encoding="utf-8") as z:
-                        for i, segment in enumerate(result["segments"]):
-                            start = format_timestamp(segment["start"])
-                            end = format_timestamp(segment["end"])
-                            text = segment["text"].strip()
-                            z.write(f"{i + 1}\n")
-                            z.write(f"{start} --> {end}\n")
-                            z.write(f"{text}\n\n")
-
-                    log_queue.put(f"已轉錄 {audio_path} 到 {srt_path}")
-
-                    # 如果臨時創建了 WAV 檔案，刪除它
-                    if not filename.endswith(".wav"):
-                        os.remove(wav_path)
-
-                except Exception as e:
-                    log_queue.put(f"處理 {audio_path} 時發生錯誤: {str(e)}")
-
-    log_queue.put("所有檔案處理完成。")
+    # 先收集目錄及其子目錄中的所有音頻檔案，按檔案大小排序以減少批次填充浪費
+    audio_paths = sorted(iter_audio(root_audio_dir), key=os.path.getsize)
+
+    for audio_path in audio_paths:
+        log(f"正在處理: {audio_path}")
+
+        try:
+            # 將音頻解碼到記憶體
+            audio_array = load_audio(audio_path)
+
+            # 使用 Whisper 模型批次轉錄音頻
+            segments, info = batched_model.transcribe(
+                audio_array, batch_size=BATCH_SIZE, beam_size=1, best_of=1, temperature=0,
+                condition_on_previous_text=False, vad_filter=True
+            )
+
+            # 將轉錄文本保存到 .srt 檔案，與源檔案在同一目錄
+            srt_path = os.path.splitext(audio_path)[0] + ".srt"
+            lines = [
+                f"{i + 1}\n{fmt(segment.start)} --> {fmt(segment.end)}\n{segment.text.strip()}\n\n"
+                for i, segment in enumerate(segments)
+            ]
+            with open(srt_path, "w", encoding="utf-8") as z:
+                z.write("".join(lines))
+
+            log(f"已轉錄 {audio_path} 到 {srt_path}")
+
+        except Exception as e:
+            log(f"處理 {audio_path} 時發生錯誤: {str(e)}")
+
+    log("所有檔案處理完成。")
 
 # 選擇目錄並開始處理
 def start_processing():
     root_audio_dir = filedialog.askdirectory(title="請選擇音頻檔案所在的根目錄路徑")
     if not root_audio_dir:
-        log_queue.put("未選擇目錄，程式終止。")
+        log("未選擇目錄，程式終止。")
         return
 
     # 啟動後台線程處理檔案
@@ -115,8 +112,8 @@ start_button.pack(pady=10)
 end_button = tk.Button(root, text="結束", command=root.quit)
 end_button.pack(pady=10)
 
-# 啟動日志更新
-update_log()
+# 有新日志時才更新
+root.bind("<<LogAvailable>>", lambda e: drain_log_queue())
 
 # 運行主循環
 root.mainloop()
\ No newline at end of file
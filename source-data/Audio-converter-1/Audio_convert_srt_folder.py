@@ -1,8 +1,8 @@
 import os
-import whisper
-from pydub import AudioSegment
+from faster_whisper import WhisperModel
 import torch
-import shutil
+from timestamps import fmt
+from tools import ensure_ffmpeg, iter_audio, load_audio
 from tkinter import Tk
 from tkinter.filedialog import askdirectory
 
@@ -11,13 +11,20 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"Using device: {device}")
 
 # 检查 ffmpeg 和 ffprobe 是否在 PATH 中
-if shutil.which("ffmpeg") is None:
-    raise RuntimeError("ffmpeg is not found in PATH")
-if shutil.which("ffprobe") is None:
-    raise RuntimeError("ffprobe is not found in PATH")
+ensure_ffmpeg()
 
 # 初始化 Whisper 模型，并指定设备（GPU 或 CPU）
-model = whisper.load_model("base", device=device)
+# 使用 faster-whisper (CTranslate2)，GPU 用 int8_float16，CPU 用 int8 量化
+# Ampere 及以上的 GPU 启用 FlashAttention-2 自注意力
+use_flash_attention = device == "cuda" and torch.cuda.get_device_capability()[0] >= 8
+compute_type = "int8_float16" if device == "cuda" else "int8"
+# 标准 CTranslate2 wheel 未编译 FlashAttention 内核时退回普通注意力
+try:
+    model = WhisperModel("base", device=device, compute_type=compute_type, flash_attention=use_flash_attention)
+except (RuntimeError, ValueError):
+    if not use_flash_attention:
+        raise
+    model = WhisperModel("base", device=device, compute_type=compute_type)
 
 # 使用 tkinter 打开文件浏览器对话框选择音频文件根目录
 Tk().withdraw()  # 隐藏主窗口
@@ -28,52 +35,28 @@ if not root_audio_dir:
     exit()
 
 
-# 时间格式转换函数
-def format_timestamp(seconds):
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    seconds = int(seconds)
-    minutes = seconds // 60
-    seconds = seconds % 60
-    hours = minutes // 60
-    minutes = minutes % 60
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
-
-
 # 递归处理目录及其子目录中的所有音频文件
-for root, dirs, files in os.walk(root_audio_dir):
-    for filename in files:
-        if filename.endswith((".mp3", ".wav", ".m4a")):
-            audio_path = os.path.join(root, filename)
-
-            print(f"正在处理: {audio_path}")
-
-            # 将音频文件转换为 WAV 格式（如果不是 WAV 格式）
-            if not filename.endswith(".wav"):
-                audio = AudioSegment.from_file(audio_path)
-                # 临时 WAV 文件路径
-                wav_path = os.path.join(root, f"{os.path.splitext(filename)[0]}.wav")
-                audio.export(wav_path, format="wav")
-            else:
-                wav_path = audio_path
-
-            # 使用 Whisper 模型转录音频
-            result = model.transcribe(wav_path)
-
-            # 将转录文本保存到 .srt 文件，与源文件在同一目录
-            srt_path = os.path.join(root, f"{os.path.splitext(filename)[0]}.srt")
-            with open(srt_path, "w", encoding="utf-8") as z:
-                for i, segment in enumerate(result["segments"]):
-                    start = format_timestamp(segment["start"])
-                    end = format_timestamp(segment["end"])
-                    text = segment["text"].strip()
-                    z.write(f"{i + 1}\n")
-                    z.write(f"{start} --> {end}\n")
-                    z.write(f"{text}\n\n")
-
-            print(f"已转录 {audio_path} 到 {srt_path}")
-
-            # 如果临时创建了 WAV 文件，删除它
-            if not filename.endswith(".wav"):
-                os.remove(wav_path)
+for audio_path in iter_audio(root_audio_dir):
+    print(f"正在处理: {audio_path}")
+
+    # 将音频解码到内存
+    audio_array = load_audio(audio_path)
+
+    # 使用 Whisper 模型转录音频
+    segments, info = model.transcribe(
+        audio_array, beam_size=1, best_of=1, temperature=0,
+        condition_on_previous_text=False, vad_filter=True
+    )
+
+    # 将转录文本保存到 .srt 文件，与源文件在同一目录
+    srt_path = os.path.splitext(audio_path)[0] + ".srt"
+    lines = [
+        f"{i + 1}\n{fmt(segment.start)} --> {fmt(segment.end)}\n{segment.text.strip()}\n\n"
+        for i, segment in enumerate(segments)
+    ]
+    with open(srt_path, "w", encoding="utf-8") as z:
+        z.write("".join(lines))
+
+    print(f"已转录 {audio_path} 到 {srt_path}")
 
 print("所有文件处理完成。")
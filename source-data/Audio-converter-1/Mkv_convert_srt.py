@@ -1,24 +1,32 @@
 import subprocess
-import whisper
+from functools import lru_cache
+import ctranslate2
+import numpy as np
+from faster_whisper import WhisperModel
+from timestamps import fmt
 from tkinter import Tk, filedialog
 import os
 
-def extract_audio(video_path, audio_path):
-    subprocess.run([
+device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+@lru_cache(maxsize=1)
+def get_model(size="base", device=device):
+    # 同一 (size, device) 只加載一次模型
+    return WhisperModel(size, device=device, compute_type="int8_float16" if device == "cuda" else "int8")
+
+def extract_audio(video_path):
+    # 直接在記憶體中解碼為 16kHz 單聲道 float32，不寫入 WAV
+    result = subprocess.run([
         "ffmpeg",
+        "-v", "quiet",
         "-i", video_path,
-        "-q:a", "0",
-        "-map", "a",
-        audio_path,
-        "-y"
-    ])
-
-def format_time(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+        "-map", "a:0",
+        "-f", "f32le",
+        "-ar", "16000",
+        "-ac", "1",
+        "pipe:1"
+    ], capture_output=True, check=True)
+    return np.frombuffer(result.stdout, np.float32)
 
 def main():
     # 使用者選擇檔案
@@ -34,27 +42,24 @@ def main():
 
     # 設定檔案路徑
     base_name = os.path.splitext(os.path.basename(video_path))[0]
-    audio_path = f"{base_name}.wav"
     srt_path = f"{base_name}.srt"
 
     # 提取音訊
-    extract_audio(video_path, audio_path)
-
-    # 加載 Whisper 模型
-    model = whisper.load_model("base")
+    audio_array = extract_audio(video_path)
 
     # 進行語音識別
-    result = model.transcribe(audio_path)
+    segments, info = get_model().transcribe(
+        audio_array, beam_size=1, best_of=1, temperature=0,
+        condition_on_previous_text=False, vad_filter=True
+    )
 
     # 保存字幕檔案
+    lines = [
+        f"{i + 1}\n{fmt(segment.start)} --> {fmt(segment.end)}\n{segment.text}\n\n"
+        for i, segment in enumerate(segments)
+    ]
     with open(srt_path, "w", encoding="utf-8") as srt_file:
-        for i, segment in enumerate(result["segments"]):
-            start = segment["start"]
-            end = segment["end"]
-            text = segment["text"]
-            srt_file.write(f"{i+1}\n")
-            srt_file.write(f"{format_time(start)} --> {format_time(end)}\n")
-            srt_file.write(f"{text}\n\n")
+        srt_file.write("".join(lines))
     
     print(f"字幕檔已保存為: {srt_path}")
 
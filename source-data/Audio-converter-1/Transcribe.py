@@ -1,31 +1,48 @@
+import os
 import sys
-import whisper
-import ffmpeg
+from functools import lru_cache
+import ctranslate2
+from faster_whisper import WhisperModel
+from timestamps import fmt
+
+device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+@lru_cache(maxsize=1)
+def get_model(size="base", device=device):
+    # 同一 (size, device) 只加載一次模型
+    return WhisperModel(size, device=device, compute_type="int8_float16" if device == "cuda" else "int8")
 
 def transcribe_audio_to_srt(audio_path, srt_path):
-    model = whisper.load_model("base")
-    result = model.transcribe(audio_path)
+    model = get_model()
+    segments, info = model.transcribe(
+        audio_path, beam_size=1, best_of=1, temperature=0,
+        condition_on_previous_text=False, vad_filter=True
+    )
 
-    segments = result["segments"]
+    lines = [
+        f"{i + 1}\n{fmt(segment.start)} --> {fmt(segment.end)}\n{segment.text}\n\n"
+        for i, segment in enumerate(segments)
+    ]
     with open(srt_path, "w") as srt_file:
-        for i, segment in enumerate(segments):
-            start = segment["start"]
-            end = segment["end"]
-            text = segment["text"]
-            srt_file.write(f"{i + 1}\n")
-            srt_file.write(f"{format_time(start)} --> {format_time(end)}\n")
-            srt_file.write(f"{text}\n\n")
+        srt_file.write("".join(lines))
 
-def format_time(seconds):
-    millis = int((seconds % 1) * 1000)
-    seconds = int(seconds)
-    minutes = int(seconds // 60)
-    seconds = seconds % 60
-    hours = int(minutes // 60)
-    minutes = minutes % 60
-    return f"{hours:02}:{minutes:02}:{seconds:02},{millis:03}"
+def serve():
+    # 常駐模式：從 stdin 逐行讀取音檔路徑，模型保持在記憶體中
+    for line in sys.stdin:
+        audio_path = line.strip()
+        if not audio_path:
+            continue
+        srt_path = os.path.splitext(audio_path)[0] + ".srt"
+        try:
+            transcribe_audio_to_srt(audio_path, srt_path)
+            print(srt_path, flush=True)
+        except Exception as e:
+            print(f"Error transcribing {audio_path}: {e}", file=sys.stderr, flush=True)
 
 if __name__ == "__main__":
-    audio_path = sys.argv[1]
-    srt_path = sys.argv[2]
-    transcribe_audio_to_srt(audio_path, srt_path)
+    if len(sys.argv) > 1 and sys.argv[1] == "--server":
+        serve()
+    else:
+        audio_path = sys.argv[1]
+        srt_path = sys.argv[2]
+        transcribe_audio_to_srt(audio_path, srt_path)
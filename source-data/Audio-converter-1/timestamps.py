@@ -0,0 +1,7 @@
+# 字幕時間戳格式化（SRT 用 ','，WebVTT 用 '.'）
+def fmt(sec, sep=','):
+    ms = int(sec * 1000)
+    s, ms = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02}:{m:02}:{s:02}{sep}{ms:03}"
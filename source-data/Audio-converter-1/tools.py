@@ -0,0 +1,52 @@
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+import numpy as np
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a")
+# 這些格式直接用 soundfile 讀取，不必啟動 ffmpeg（未安裝 soundfile/scipy 時仍走 ffmpeg）
+SOUNDFILE_EXTENSIONS = (".wav", ".flac", ".ogg")
+SAMPLE_RATE = 16000
+
+# 只解析一次 ffmpeg / ffprobe 的絕對路徑，並寫入環境變數供子程序使用
+@lru_cache(maxsize=1)
+def ensure_ffmpeg():
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is None:
+        raise RuntimeError("ffmpeg is not found in PATH")
+    ffprobe_path = shutil.which("ffprobe")
+    if ffprobe_path is None:
+        raise RuntimeError("ffprobe is not found in PATH")
+    os.environ["FFMPEG_BINARY"] = ffmpeg_path
+    os.environ["FFPROBE_BINARY"] = ffprobe_path
+    return ffmpeg_path, ffprobe_path
+
+# 以 os.scandir 遞迴列出目錄下的音頻檔案（副檔名不分大小寫）
+def iter_audio(root):
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_audio(entry.path)
+        elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+            yield entry.path
+
+# 讀取音頻為 16kHz 單聲道 float32 陣列，不寫入臨時 WAV
+def load_audio(audio_path):
+    if audio_path.lower().endswith(SOUNDFILE_EXTENSIONS):
+        try:
+            import soundfile as sf
+            from scipy.signal import resample_poly
+        except ImportError:
+            pass
+        else:
+            data, sr = sf.read(audio_path, dtype='float32', always_2d=False)
+            if data.ndim > 1:
+                data = data.mean(axis=1)
+            if sr != SAMPLE_RATE:
+                data = resample_poly(data, SAMPLE_RATE, sr).astype(np.float32)
+            return data
+    ffmpeg_path, _ = ensure_ffmpeg()
+    out = subprocess.check_output(
+        [ffmpeg_path, "-v", "quiet", "-i", audio_path, "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1", "pipe:1"]
+    )
+    return np.frombuffer(out, np.float32)
@@ -2,10 +2,11 @@ import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext
 from pydub import AudioSegment
-import threading
+import bisect
 import os
 import tempfile
-import time
+import hashlib
+from pathlib import Path
 import re
 
 # Initialize pygame mixer
@@ -23,40 +24,49 @@ root.title("Peter Audio Player")
 text_area = scrolledtext.ScrolledText(root, width=40, height=5, font=FONT_STYLE)
 text_area.pack(pady=10)
 
-# Define a function to parse .srt files for subtitles
+SRT_RE = re.compile(
+    r'(\d+)\n(\d+):(\d+):(\d+),(\d+)\s*-->\s*(\d+):(\d+):(\d+),(\d+)\n(.+?)(?=\n\n|\Z)', re.S
+)
+
+# Define a function to parse .srt files for subtitles (single regex pass)
 def parse_srt(file_path):
     subtitles = []
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        blocks = content.strip().split('\n\n')
-        for block in blocks:
-            lines = block.split('\n')
-            if len(lines) >= 3:
-                time_range = lines[1]
-                text = ' '.join(lines[2:])
-                start_time_str, end_time_str = time_range.split(' --> ')
-                start_time = parse_srt_time(start_time_str)
-                end_time = parse_srt_time(end_time_str)
-                subtitles.append((start_time, end_time, text))
+    content = Path(file_path).read_bytes().decode('utf-8-sig').replace('\r\n', '\n')
+    for m in SRT_RE.finditer(content):
+        _, h1, m1, s1, ms1, h2, m2, s2, ms2, text = m.groups()
+        start_time = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000
+        end_time = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000
+        subtitles.append((start_time, end_time, text.strip().replace('\n', ' ')))
     return subtitles
 
-# Parse the time format used in .srt files (hh:mm:ss,ms)
-def parse_srt_time(time_str):
-    hours, minutes, seconds = time_str.split(':')
-    seconds, milliseconds = seconds.split(',')
-    total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-    return total_seconds + int(milliseconds) / 1000
-
-# Update the subtitles displayed in the text area
-def update_subtitles(subtitles):
-    while pygame.mixer.music.get_busy():
+# Update the subtitles displayed in the text area from a Tk after() timer
+TICK_MS = 250
+tick_job = None
+
+def start_subtitle_tick(subtitles):
+    global tick_job
+    if tick_job is not None:
+        root.after_cancel(tick_job)
+    starts = [start for start, _, _ in subtitles]  # Already sorted by start time
+    last_idx = -1
+
+    def tick():
+        global tick_job
+        nonlocal last_idx
+        tick_job = None
+        if not pygame.mixer.music.get_busy():
+            return
         current_time = pygame.mixer.music.get_pos() // 1000
-        for start, end, text in subtitles:
+        idx = bisect.bisect_right(starts, current_time) - 1
+        if idx >= 0 and idx != last_idx:
+            start, end, text = subtitles[idx]
             if start <= current_time <= end:
                 text_area.delete(1.0, tk.END)
                 text_area.insert(tk.END, text)
-                break
-        time.sleep(0.5)
+                last_idx = idx
+        tick_job = root.after(TICK_MS, tick)
+
+    tick_job = root.after(TICK_MS, tick)
 
 # Define functions to control the music player
 def play_music():
@@ -76,30 +86,37 @@ def play_music():
             pygame.mixer.music.load(file_path)
             pygame.mixer.music.play()
             if subtitles:
-                threading.Thread(target=update_subtitles, args=(subtitles,)).start()
+                start_subtitle_tick(subtitles)
         elif file_path.endswith('.m4a'):
             play_m4a(file_path, subtitles)
 
+# Decoded m4a tracks are cached as WAV files and reused on replay
+WAV_CACHE_DIR = Path(tempfile.gettempdir()) / "peter_audio_wavcache"
+
+def cached_wav_path(file_path):
+    st = os.stat(file_path)
+    key = hashlib.sha1(f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}".encode("utf-8")).hexdigest()
+    return WAV_CACHE_DIR / f"{key}.wav"
+
+def get_cached_wav(file_path):
+    wav_path = cached_wav_path(file_path)
+    if not wav_path.exists():
+        WAV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        partial_path = wav_path.with_suffix(".part")
+        AudioSegment.from_file(file_path).export(str(partial_path), format="wav")
+        os.replace(partial_path, wav_path)
+    return str(wav_path)
+
 def play_m4a(file_path, subtitles):
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # Close the file so that it can be used by other processes
-    audio.export(temp_wav_file.name, format="wav")
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        if subtitles:
-            threading.Thread(target=update_subtitles, args=(subtitles,)).start()
-        # Delete the temporary file after playback is complete
-        def cleanup():
-            pygame.mixer.music.set_endevent(pygame.USEREVENT)
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-            pygame.mixer.music.stop()  # Stop audio playback
-            os.remove(temp_wav_file.name)
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"Failed to create temporary file: {temp_wav_file.name}")
+    try:
+        wav_path = get_cached_wav(file_path)
+    except Exception as e:
+        print(f"Failed to decode {file_path}: {e}")
+        return
+    pygame.mixer.music.load(wav_path)
+    pygame.mixer.music.play()
+    if subtitles:
+        start_subtitle_tick(subtitles)
 
 def stop_music():
     pygame.mixer.music.stop()
@@ -3,17 +3,44 @@ import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk, font
 from pydub import AudioSegment
 import threading
+import queue
+import bisect
+import re
 import os
 import tempfile
+import hashlib
+import wave
+import subprocess
 import time
-import whisper
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 import torch
 
 # Initialize pygame mixer
 pygame.mixer.init()
 
-# Initialize Whisper model
-whisper_model = whisper.load_model("base")
+# FlashAttention-2 self-attention on Ampere and newer GPUs; stock CTranslate2
+# wheels ship without the kernels, so fall back to regular attention
+def _load_gpu_model(i):
+    if torch.cuda.get_device_capability(i)[0] >= 8:
+        try:
+            return WhisperModel("base", device="cuda", device_index=i, compute_type="int8_float16",
+                                flash_attention=True)
+        except (RuntimeError, ValueError):
+            pass
+    return WhisperModel("base", device="cuda", device_index=i, compute_type="int8_float16")
+
+# Initialize Whisper models (faster-whisper, int8 quantized): one per visible GPU, or one on CPU
+n_gpus = torch.cuda.device_count()
+if n_gpus:
+    whisper_models = [_load_gpu_model(i) for i in range(n_gpus)]
+else:
+    whisper_models = [WhisperModel("base", device="cpu", compute_type="int8")]
+batched_models = [BatchedInferencePipeline(model=model) for model in whisper_models]
+BATCH_SIZE = 8
+TRANSCRIBE_WORKERS = max(1, n_gpus * 2)
 
 # Define a global font for the Tkinter application
 FONT_SIZE = 15
@@ -40,60 +67,58 @@ current_duration = 0
 is_closing = False  # Flag to indicate if the program is closing
 is_paused = False  # Flag to indicate if the playback is paused
 
-# Define a function to parse .srt files for subtitles
+SRT_RE = re.compile(
+    r'(\d+)\n(\d+):(\d+):(\d+),(\d+)\s*-->\s*(\d+):(\d+):(\d+),(\d+)\n(.+?)(?=\n\n|\Z)', re.S
+)
+
+# Define a function to parse .srt files for subtitles (single regex pass)
 def parse_srt(file_path):
     subtitles = []
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        blocks = content.strip().split('\n\n')
-        for block in blocks:
-            lines = block.split('\n')
-            if len(lines) >= 3:
-                index = lines[0]
-                time_range = lines[1]
-                text = ' '.join(lines[2:])
-                start_time_str, end_time_str = time_range.split(' --> ')
-                start_time = parse_srt_time(start_time_str)
-                end_time = parse_srt_time(end_time_str)
-                subtitles.append((start_time, end_time, text))
+    content = Path(file_path).read_bytes().decode('utf-8-sig').replace('\r\n', '\n')
+    for m in SRT_RE.finditer(content):
+        _, h1, m1, s1, ms1, h2, m2, s2, ms2, text = m.groups()
+        start_time = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000
+        end_time = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000
+        subtitles.append((start_time, end_time, text.strip().replace('\n', ' ')))
     return subtitles
 
-# Parse the time format used in .srt files (hh:mm:ss,ms)
-def parse_srt_time(time_str):
-    hours, minutes, seconds = time_str.split(':')
-    seconds, milliseconds = seconds.split(',')
-    total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-    return total_seconds + int(milliseconds) / 1000
-
-# Update the subtitles displayed in the text area
-def update_subtitles():
-    def update_text(text):
-        text_area.delete(1.0, tk.END)
-        text_area.insert(tk.END, text)
-
-    while pygame.mixer.music.get_busy() and current_subtitles:
-        if is_closing:
+# Periodic UI tick on the Tk thread: update the subtitle and the progress bar
+TICK_MS = 250
+tick_job = None
+tick_subtitles = None
+tick_starts = []
+tick_last_idx = -1
+
+def tick():
+    global tick_job, tick_subtitles, tick_starts, tick_last_idx
+    tick_job = None
+    if is_closing:
+        return
+    if not is_paused:
+        if not pygame.mixer.music.get_busy():
             return
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            for start, end, text in current_subtitles:
+        current_time = pygame.mixer.music.get_pos() // 1000
+        progress_bar["value"] = current_time
+        if current_subtitles:
+            if tick_subtitles is not current_subtitles:
+                # Track changed: rebuild the sorted start-time index
+                tick_subtitles = current_subtitles
+                tick_starts = [start for start, _, _ in tick_subtitles]
+                tick_last_idx = -1
+            idx = bisect.bisect_right(tick_starts, current_time) - 1
+            if idx >= 0 and idx != tick_last_idx:
+                start, end, text = tick_subtitles[idx]
                 if start <= current_time <= end:
-                    root.after(0, update_text, text)
-                    break
-        time.sleep(0.5)
+                    text_area.delete(1.0, tk.END)
+                    text_area.insert(tk.END, text)
+                    tick_last_idx = idx
+    tick_job = root.after(TICK_MS, tick)
 
-# Update the progress bar
-def update_progress_bar():
-    def set_progress(value):
-        progress_bar["value"] = value
-
-    while pygame.mixer.music.get_busy():
-        if is_closing:
-            return
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            root.after(0, set_progress, current_time)
-        time.sleep(1)
+def start_tick():
+    global tick_job
+    if tick_job is not None:
+        root.after_cancel(tick_job)
+    tick_job = root.after(TICK_MS, tick)
 
 # Define a function to play a single audio file
 def play_single_file(file_path):
@@ -112,23 +137,107 @@ def play_single_file(file_path):
     else:
         text_area.insert(tk.END, "No associated .srt file found.")
 
-    # Get the audio file duration
-    if file_path.endswith('.mp3') or file_path.endswith('.m4a'):
-        audio = AudioSegment.from_file(file_path)
-        current_duration = len(audio) // 1000  # Duration in seconds
-        progress_bar["maximum"] = current_duration
-
-    # Play the audio file
+    # Play the audio file (m4a duration comes from the cached WAV header in play_m4a)
     if file_path.endswith('.mp3'):
+        current_duration = get_duration(file_path)
+        progress_bar["maximum"] = current_duration
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()
-        threading.Thread(target=update_progress_bar).start()
+        start_tick()
     elif file_path.endswith('.m4a'):
         play_m4a(file_path)
 
     highlight_current_song()
+    schedule_prefetch(current_index)
+
+# Decoded m4a tracks are cached as WAV files and reused on replay. WAVs are
+# ~10x the source size, so the least recently used ones are evicted above the cap
+WAV_CACHE_DIR = Path(tempfile.gettempdir()) / "peter_audio_wavcache"
+WAV_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+def trim_wav_cache(keep=None):
+    try:
+        with os.scandir(WAV_CACHE_DIR) as it:
+            entries = [(entry.path, entry.stat()) for entry in it]
+    except FileNotFoundError:
+        return
+    stale_before = time.time() - 3600
+    doomed, cached = [], []
+    for path, st in entries:
+        if path.endswith(".part"):
+            if st.st_mtime < stale_before:  # Left behind by an interrupted export
+                doomed.append(path)
+        elif path != keep:  # Never evict the track about to be played
+            cached.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+    total = sum(size for _, size, _ in cached)
+    for _, size, path in sorted(cached):  # Least recently used first
+        if total <= WAV_CACHE_MAX_BYTES:
+            break
+        doomed.append(path)
+        total -= size
+    for path in doomed:
+        try:
+            os.remove(path)
+        except OSError as e:  # Still open by the mixer on Windows
+            print(f"Failed to evict {path}: {e}")
+
+def cached_wav_path(file_path):
+    st = os.stat(file_path)
+    key = hashlib.sha1(f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}".encode("utf-8")).hexdigest()
+    return WAV_CACHE_DIR / f"{key}.wav"
+
+def get_cached_wav(file_path):
+    wav_path = cached_wav_path(file_path)
+    try:
+        os.utime(wav_path)  # Mark as recently used; atime updates are often disabled
+    except FileNotFoundError:
+        WAV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        partial_path = wav_path.with_suffix(f".{threading.get_ident()}.part")
+        AudioSegment.from_file(file_path).export(str(partial_path), format="wav")
+        os.replace(partial_path, wav_path)
+        trim_wav_cache(keep=str(wav_path))
+    return str(wav_path)
+
+threading.Thread(target=trim_wav_cache, daemon=True).start()
+
+# Decode the next track in the background while the current one plays
+prefetch_queue = queue.Queue(maxsize=1)
+prefetched_durations = {}
+
+def prefetch_worker():
+    while True:
+        file_path = prefetch_queue.get()
+        try:
+            if file_path.endswith('.m4a'):
+                get_cached_wav(file_path)
+            else:
+                prefetched_durations[file_path] = duration_s(file_path)
+        except Exception as e:
+            print(f"Failed to prefetch {file_path}: {e}")
+
+threading.Thread(target=prefetch_worker, daemon=True).start()
+
+def schedule_prefetch(index):
+    if not audio_files:
+        return
+    next_file = audio_files[(index + 1) % len(audio_files)]
+    try:
+        prefetch_queue.put_nowait(next_file)
+    except queue.Full:
+        pass  # The worker is still busy with an earlier track
+
+# Read the container duration with ffprobe instead of decoding the whole file
+def duration_s(file_path):
+    out = subprocess.check_output(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nk=1:nw=1", file_path]
+    )
+    return float(out)
+
+def get_duration(file_path):
+    duration = prefetched_durations.pop(file_path, None)
+    if duration is None:
+        duration = duration_s(file_path)
+    return int(duration)  # Duration in seconds
 
 # Define functions to control the music player
 def play_m4a(file_path):
@@ -136,37 +245,18 @@ def play_m4a(file_path):
     current_audio_file = file_path
     is_paused = False  # Reset paused state
     
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # Close the file so that it can be used by other processes
-    audio.export(temp_wav_file.name, format="wav")
-    current_duration = len(audio) // 1000  # Duration in seconds
+    try:
+        wav_path = get_cached_wav(file_path)
+    except Exception as e:
+        print(f"Failed to decode {file_path}: {e}")
+        return
+    with wave.open(wav_path, "rb") as wav_file:
+        current_duration = wav_file.getnframes() // wav_file.getframerate()  # Duration in seconds
     progress_bar["maximum"] = current_duration
 
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()
-        threading.Thread(target=update_progress_bar).start()
-        # Delete the temporary file after playback is complete
-        def cleanup():
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-            pygame.mixer.music.stop()  # Stop audio playback
-            retries = 3
-            while retries > 0:
-                try:
-                    os.remove(temp_wav_file.name)
-                    break
-                except PermissionError:
-                    retries -= 1
-                    time.sleep(1)
-                    if retries == 0:
-                        print(f"Failed to remove temporary file: {temp_wav_file.name}")
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"Failed to create temporary file: {temp_wav_file.name}")
+    pygame.mixer.music.load(wav_path)
+    pygame.mixer.music.play()
+    start_tick()
 
 def play_directory():
     global audio_files, current_index
@@ -180,36 +270,53 @@ def play_directory():
             play_audio_files_sequentially(audio_files)
 
 def transcribe_audio_files():
-    for file_path in audio_files:
-        srt_file_path = os.path.splitext(file_path)[0] + ".srt"
-        if not os.path.exists(srt_file_path):
-            convert_to_srt(file_path)
-            root.after(0, update_song_list)  # Refresh song list after transcription is done
-
-def convert_to_srt(audio_file):
+    # Shortest files first so subtitles become available as early as possible
+    pending = [
+        file_path for file_path in sorted(audio_files, key=os.path.getsize)
+        if not os.path.exists(os.path.splitext(file_path)[0] + ".srt")
+    ]
+    # Round-robin the files over the loaded models, two concurrent jobs per GPU
+    with ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS) as executor:
+        futures = [
+            executor.submit(convert_to_srt, file_path, batched_models[i % len(batched_models)])
+            for i, file_path in enumerate(pending)
+        ]
+        for _ in as_completed(futures):
+            root.after(0, update_song_list)  # Refresh song list after each transcription is done
+
+# Decode straight to 16 kHz mono float32 with ffmpeg (no temp WAV)
+def load_audio(audio_path):
+    out = subprocess.check_output(
+        ["ffmpeg", "-v", "quiet", "-i", audio_path, "-f", "f32le", "-ar", "16000", "-ac", "1", "pipe:1"]
+    )
+    return np.frombuffer(out, np.float32)
+
+def convert_to_srt(audio_file, model):
     message = f"Transcribing {audio_file} using Whisper...\n"
     root.after(0, lambda: conversion_messages.insert(tk.END, message))
     try:
-        result = whisper_model.transcribe(audio_file)
+        audio_array = load_audio(audio_file)
+        segments, info = model.transcribe(
+            audio_array, batch_size=BATCH_SIZE, beam_size=1, best_of=1, temperature=0,
+            condition_on_previous_text=False, vad_filter=True
+        )
         srt_file_path = os.path.splitext(audio_file)[0] + ".srt"
+        lines = [
+            f"{i}\n{format_time(segment.start)} --> {format_time(segment.end)}\n{segment.text.strip()}\n\n"
+            for i, segment in enumerate(segments, start=1)
+        ]
         with open(srt_file_path, "w", encoding="utf-8") as srt_file:
-            for i, segment in enumerate(result["segments"], start=1):
-                start = segment["start"]
-                end = segment["end"]
-                text = segment["text"].strip()
-                start_time_str = format_time(start)
-                end_time_str = format_time(end)
-                srt_file.write(f"{i}\n{start_time_str} --> {end_time_str}\n{text}\n\n")
+            srt_file.write("".join(lines))
         message = f"Transcription for {audio_file} completed.\n"
     except Exception as e:
         message = f"Error transcribing {audio_file}: {e}\n"
     root.after(0, lambda: conversion_messages.insert(tk.END, message))
 
 def format_time(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
+    milliseconds = int(seconds * 1000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
     return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
 
 def play_audio_files_sequentially(audio_files):
@@ -259,26 +366,39 @@ def pause_music():
             is_paused = True
 
 def update_song_list():
-    song_listbox.delete(1.0, tk.END)
+    # Only touch rows whose name or subtitle state actually changed
     for i, file in enumerate(audio_files):
-        song_name = os.path.basename(file)
-        srt_file_path = os.path.splitext(file)[0] + ".srt"
-        if os.path.exists(srt_file_path):
-            song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n", 'bold')
-        else:
-            song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n")
+        iid = str(i)
+        has_srt = os.path.exists(os.path.splitext(file)[0] + ".srt")
+        values = (f"{i + 1}. {os.path.basename(file)}", "SRT" if has_srt else "")
+        tags = ('bold',) if has_srt else ()
+        if not song_listbox.exists(iid):
+            song_listbox.insert("", tk.END, iid=iid, values=values, tags=tags)
+        elif tuple(song_listbox.item(iid, "values")) != values:
+            song_listbox.item(iid, values=values, tags=tags)
+    stale = song_listbox.get_children()[len(audio_files):]
+    if stale:
+        song_listbox.delete(*stale)
     highlight_current_song()
 
 def on_song_select(event):
     global current_index, is_paused
+    selection = song_listbox.selection()
+    if not selection:
+        return
+    index = int(selection[0])
+    if index == current_index:
+        return  # Selection was set by highlight_current_song
     is_paused = False  # Reset paused state
-    current_index = int(event.widget.index("current").split('.')[0]) - 1
+    current_index = index
     play_single_file(audio_files[current_index])
 
 def highlight_current_song():
     def highlight():
-        song_listbox.tag_remove('highlight', '1.0', tk.END)
-        song_listbox.tag_add('highlight', f'{current_index + 1}.0', f'{current_index + 1}.end')
+        iid = str(current_index)
+        if song_listbox.exists(iid) and song_listbox.selection() != (iid,):
+            song_listbox.selection_set(iid)
+            song_listbox.see(iid)
     root.after(0, highlight)
 
 def close_program():
@@ -310,12 +430,16 @@ progress_frame.pack(pady=10)
 progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=400, mode="determinate")
 progress_bar.pack()
 
-# Create song list box using Text widget with tags for bold and highlight
-song_listbox = tk.Text(root, width=50, height=20)  # Adjusted height to 20
+# Create song list using a Treeview; the current song is shown as the selection
+song_listbox = ttk.Treeview(root, columns=("name", "has_srt"), show="headings", height=20, selectmode="browse")
+song_listbox.heading("name", text="Song")
+song_listbox.heading("has_srt", text="Subtitles")
+song_listbox.column("name", width=360)
+song_listbox.column("has_srt", width=80, anchor="center")
 song_listbox.pack(pady=10)
 song_listbox.tag_configure('bold', font=('Helvetica', 10, 'bold'))
-song_listbox.tag_configure('highlight', background='yellow')
-song_listbox.bind('<Button-1>', on_song_select)
+ttk.Style().map("Treeview", background=[("selected", "yellow")], foreground=[("selected", "black")])
+song_listbox.bind('<<TreeviewSelect>>', on_song_select)
 
 # Run the Tkinter application
 root.mainloop()
@@ -0,0 +1,74 @@
+import functools
+import io
+import mmap
+import os
+import re
+import subprocess
+import wave
+import mutagen
+import numpy as np
+
+# One regex pass straight over the memory-mapped file (no copy of the
+# content); times are integer milliseconds
+_SRT_RE = re.compile(rb'(\d+):(\d+):(\d+),(\d+)\s*-->\s*(\d+):(\d+):(\d+),(\d+)\r?\n(.*?)(?=\r?\n\r?\n|\Z)', re.DOTALL)
+
+# A track's cues as parallel arrays: start/end times (ms) and texts. Players
+# publish a new clock by rebinding one reference, so readers on other threads
+# always see a complete track without locking.
+class SubtitleClock:
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts, ends, texts):
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.texts)
+
+    # Cue to show at t ms and how long until the next cue starts. The index
+    # is -1 between cues; the wait is None after the last cue has started.
+    def tick(self, t):
+        i = int(np.searchsorted(self.starts, t, side='right')) - 1
+        wait = int(self.starts[i + 1]) - t if i + 1 < len(self.starts) else None
+        if i < 0 or self.ends[i] < t:
+            return -1, wait
+        return i, wait
+
+EMPTY_CLOCK = SubtitleClock([], [], [])
+
+# Parse an .srt file into a SubtitleClock
+def parse_srt(file_path):
+    if os.path.getsize(file_path) == 0:  # mmap cannot map an empty file
+        return EMPTY_CLOCK
+    starts, ends, texts = [], [], []
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for h1, m1, s1, ms1, h2, m2, s2, ms2, txt in _SRT_RE.findall(data):
+            starts.append(int(h1) * 3600000 + int(m1) * 60000 + int(s1) * 1000 + int(ms1))
+            ends.append(int(h2) * 3600000 + int(m2) * 60000 + int(s2) * 1000 + int(ms2))
+            texts.append(txt.decode('utf-8').strip().replace('\r', '').replace('\n', ' '))
+    return SubtitleClock(starts, ends, texts)
+
+# Cache parsed cues and durations per (path, mtime) so Next/Previous
+# back to a recent track does not re-read it
+@functools.lru_cache(maxsize=256)
+def load_srt(path, mtime):
+    return parse_srt(path)
+
+@functools.lru_cache(maxsize=256)
+def duration_ms(path, mtime):
+    # Header-only read; no full decode just to get the length
+    if path.lower().endswith('.wav'):
+        try:
+            with wave.open(path, 'rb') as w:
+                return w.getnframes() * 1000 // w.getframerate()
+        except wave.Error:
+            pass  # Non-PCM WAV, let mutagen handle it
+    info = mutagen.File(path)
+    return int(info.info.length * 1000) if info is not None else 0
+
+# Decode to WAV through an ffmpeg pipe straight into memory; no temp files
+def decode_to_wav_bytes(path):
+    p = subprocess.run(['ffmpeg', '-v', 'quiet', '-i', path, '-f', 'wav', '-'],
+                       stdout=subprocess.PIPE, check=True)
+    return io.BytesIO(p.stdout)
@@ -1,15 +1,26 @@
 import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk, font
-from pydub import AudioSegment
-import threading
 import os
-import tempfile
-import time
-import re
-
-# Initialize pygame mixer
-pygame.mixer.init()
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+from audio_player_core import EMPTY_CLOCK, load_srt, duration_ms, decode_to_wav_bytes
+
+# pygame.mixer starts an audio thread, so initialize it on first play.
+# MUSIC_END is posted when a track finishes; it is pumped from the Tk loop.
+MUSIC_END = pygame.USEREVENT + 1
+_mixer_ready = False
+
+def _mixer():
+    global _mixer_ready
+    if not _mixer_ready:
+        pygame.mixer.init()
+        pygame.display.init()  # The event queue needs video; no window is opened
+        pygame.mixer.music.set_endevent(MUSIC_END)
+        _mixer_ready = True
+
+atexit.register(lambda: _mixer_ready and pygame.mixer.quit())
 
 # Define a global font for the Tkinter application
 FONT_SIZE = 15
@@ -24,98 +35,122 @@ text_area = scrolledtext.ScrolledText(root, width=40, height=5, font=FONT_STYLE)
 text_area.pack(pady=10)
 
 # Define global variables to store current subtitles, audio file list, and current index
-current_subtitles = []
+_clock = EMPTY_CLOCK  # Cues of the current track; replaced as a whole on track change
 current_audio_file = None
 audio_files = []
+_meta = []  # [srt path or None, duration future or None], parallel to audio_files
 current_index = -1
 current_duration = 0
+_wav_bio = None  # Keeps the in-memory WAV alive while pygame streams it
 is_closing = False  # Flag to indicate if the program is closing
 is_paused = False  # Flag to indicate if the playback is paused
 
-# Define a function to parse .srt files for subtitles
-def parse_srt(file_path):
-    subtitles = []
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        blocks = content.strip().split('\n\n')
-        for block in blocks:
-            lines = block.split('\n')
-            if len(lines) >= 3:
-                time_range = lines[1]
-                text = ' '.join(lines[2:])
-                start_time_str, end_time_str = time_range.split(' --> ')
-                start_time = parse_srt_time(start_time_str)
-                end_time = parse_srt_time(end_time_str)
-                subtitles.append((start_time, end_time, text))
-    return subtitles
-
-# Parse the time format used in .srt files (hh:mm:ss,ms)
-def parse_srt_time(time_str):
-    hours, minutes, seconds = time_str.split(':')
-    seconds, milliseconds = seconds.split(',')
-    total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-    return total_seconds + int(milliseconds) / 1000
-
-# Update the subtitles displayed in the text area
-def update_subtitles():
-    def update_text(text):
+# Subtitle tick on the Tk thread: look up the active cue and sleep until
+# the next cue starts instead of polling
+_last_shown_idx = -1
+_sub_job = None
+
+def sub_tick():
+    global _last_shown_idx, _sub_job
+    _sub_job = None
+    clock = _clock
+    if is_closing or not len(clock):
+        return
+    if is_paused:
+        _sub_job = root.after(250, sub_tick)
+        return
+    if not pygame.mixer.music.get_busy():
+        return
+    t = pygame.mixer.music.get_pos()  # Milliseconds, same unit as the cues
+    i, wait = clock.tick(t)
+    if i >= 0 and i != _last_shown_idx:
+        _last_shown_idx = i
+        text = clock.texts[i]
         text_area.delete(1.0, tk.END)
         text_area.insert(tk.END, text)
-
-    while pygame.mixer.music.get_busy() and current_subtitles:
-        if is_closing:
-            return
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            for start, end, text in current_subtitles:
-                if start <= current_time <= end:
-                    root.after(0, update_text, text)
-                    break
-        time.sleep(0.5)
-
-# Update the progress bar
-def update_progress_bar():
-    def set_progress(value):
-        progress_bar["value"] = value
-
-    while pygame.mixer.music.get_busy():
-        if is_closing:
+    if wait is not None:
+        _sub_job = root.after(max(50, wait), sub_tick)
+
+def start_sub_tick():
+    global _last_shown_idx, _sub_job
+    if _sub_job is not None:
+        root.after_cancel(_sub_job)
+    _last_shown_idx = -1
+    _sub_job = root.after(0, sub_tick)
+
+# Drain pygame events on the Tk thread; run _on_music_end when a track ends
+_on_music_end = None
+
+def _pump_pygame_events():
+    if is_closing:
+        return
+    if _mixer_ready:
+        pygame.event.pump()
+        if pygame.event.get(MUSIC_END) and _on_music_end is not None and not is_paused:
+            _on_music_end()
+    root.after(50, _pump_pygame_events)
+
+# Progress bar tick on the Tk thread
+_progress_job = None
+_last_progress = -1  # Last value written to the bar; skip redraws when unchanged
+
+def progress_tick():
+    global _progress_job, _last_progress
+    _progress_job = None
+    if is_closing:
+        return
+    if not is_paused:
+        if not pygame.mixer.music.get_busy():
             return
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            root.after(0, set_progress, current_time)
-        time.sleep(1)
+        pos = pygame.mixer.music.get_pos() // 1000
+        if pos != _last_progress:
+            _last_progress = pos
+            progress_bar["value"] = pos
+    _progress_job = root.after(1000, progress_tick)
+
+def start_progress_tick():
+    global _progress_job, _last_progress
+    if _progress_job is not None:
+        root.after_cancel(_progress_job)
+    _last_progress = -1
+    _progress_job = root.after(0, progress_tick)
 
 # Define a function to play a single audio file
-def play_single_file(file_path):
-    global current_subtitles, current_audio_file, current_index, current_duration, is_paused
+def play_single_file(index):
+    global _clock, current_audio_file, current_index, current_duration, is_paused
+    file_path = audio_files[index]
+    _prefetch(index)
+    srt_file_path, probe = _meta[index]
+    try:
+        current_duration = probe.result()  # Usually already done by the prefetch
+    except Exception as e:
+        print(f"Failed to read duration of {file_path}: {e}")
+        current_duration = 0
+    _prefetch(index + 1)  # Warm the neighbours for Next/Previous
+    _prefetch(index - 1)
     current_audio_file = file_path
     is_paused = False  # Reset paused state
+    _mixer()
 
     # Clear the text area before playing the new file
     text_area.delete(1.0, tk.END)
     
     # Look for a .srt file with the same name and display its contents
-    srt_file_path = os.path.splitext(file_path)[0] + ".srt"
-    current_subtitles = []
-    if os.path.exists(srt_file_path):
-        current_subtitles = parse_srt(srt_file_path)
+    _clock = EMPTY_CLOCK
+    if srt_file_path is not None:
+        _clock = load_srt(srt_file_path, os.path.getmtime(srt_file_path))
     else:
         text_area.insert(tk.END, "No associated .srt file found.")
 
-    # Get the audio file duration
-    if file_path.endswith('.mp3') or file_path.endswith('.m4a') or file_path.endswith('.wav'):
-        audio = AudioSegment.from_file(file_path)
-        current_duration = len(audio) // 1000  # Duration in seconds
-        progress_bar["maximum"] = current_duration
+    progress_bar["maximum"] = current_duration
 
     # Play the audio file
     if file_path.endswith('.mp3'):
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()
-        threading.Thread(target=update_progress_bar).start()
+        pygame.event.clear(MUSIC_END)  # Halting the previous track posts one too
+        start_sub_tick()
+        start_progress_tick()
     elif file_path.endswith('.m4a'):
         play_m4a(file_path)
 
@@ -123,105 +158,94 @@ def play_single_file(file_path):
 
 # Define functions to control the music player
 def play_music():
-    global audio_files, current_index
+    global audio_files, current_index, _on_music_end
     file_path = filedialog.askopenfilename(filetypes=[("Audio Files", "*.mp3 *.m4a *.wav")])
     if file_path:
+        _on_music_end = None  # A single file does not advance when it ends
         audio_files = [file_path]
+        _build_meta(set(os.listdir(os.path.dirname(file_path))))
         current_index = 0
-        play_single_file(file_path)
+        play_single_file(0)
         update_song_list()
 
 def play_m4a(file_path):
-    global current_subtitles, current_audio_file, current_duration, is_paused
+    global current_audio_file, is_paused, _wav_bio
     current_audio_file = file_path
     is_paused = False  # Reset paused state
-    
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # Close the file so that it can be used by other processes
-    audio.export(temp_wav_file.name, format="wav")
-    current_duration = len(audio) // 1000  # Duration in seconds
-    progress_bar["maximum"] = current_duration
-
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()
-        threading.Thread(target=update_progress_bar).start()
-        # Delete the temporary file after playback is complete
-        def cleanup():
-            while pygame.mixer.music.get_busy():
-                pygame.time.wait(100)
-            pygame.mixer.music.stop()  # Stop audio playback
-            retries = 3
-            while retries > 0:
-                try:
-                    os.remove(temp_wav_file.name)
-                    break
-                except PermissionError:
-                    retries -= 1
-                    time.sleep(1)
-                    if retries == 0:
-                        print(f"Failed to remove temporary file: {temp_wav_file.name}")
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"Failed to create temporary file: {temp_wav_file.name}")
+    _mixer()
+
+    try:
+        _wav_bio = decode_to_wav_bytes(file_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Failed to decode {file_path}: {e}")
+        return
+    pygame.mixer.music.load(_wav_bio)
+    pygame.mixer.music.play()
+    pygame.event.clear(MUSIC_END)  # Halting the previous track posts one too
+    start_sub_tick()
+    start_progress_tick()
 
 def play_directory():
     global audio_files, current_index
     directory_path = filedialog.askdirectory()
     if directory_path:
-        audio_files = sorted([os.path.join(directory_path, f) for f in os.listdir(directory_path) if f.endswith(('.mp3', '.m4a'))])
+        # One directory read; the name set also answers "has an .srt?" below
+        with os.scandir(directory_path) as it:
+            names = {e.name for e in it if e.is_file()}
+        audio_files = sorted(os.path.join(directory_path, n) for n in names if n.endswith(('.mp3', '.m4a')))
         if audio_files:
             current_index = 0
+            _build_meta(names)
             play_audio_files_sequentially(audio_files)
             update_song_list()
 
-def play_audio_files_sequentially(audio_files):
-    def play_next(index):
-        if index < len(audio_files):
-            global current_index
-            current_index = index
-            file_path = audio_files[index]
-            play_single_file(file_path)
-            # Setup the event to play the next file when the current file ends
-            pygame.mixer.music.set_endevent(pygame.USEREVENT)
-            def on_music_end():
-                while pygame.mixer.music.get_busy():
-                    pygame.time.wait(100)
-                play_next((index + 1) % len(audio_files))
-            threading.Thread(target=on_music_end).start()
-
-    play_next(0)
+# Advance through the global playlist, wrapping around at the end
+def _play_next_in_list():
+    global current_index
+    if audio_files:
+        current_index = (current_index + 1) % len(audio_files)
+        play_single_file(current_index)
+
+def play_audio_files_sequentially(files):
+    global _on_music_end, current_index
+    # Play the next file when the current one ends
+    _on_music_end = _play_next_in_list
+    if files:
+        current_index = 0
+        play_single_file(0)
 
 def next_music():
     global current_index, is_paused
     is_paused = False  # Reset paused state
     if current_index >= 0 and current_index < len(audio_files) - 1:
         current_index += 1
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
     else:
         current_index = 0
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
 
 def previous_music():
     global current_index, is_paused
     is_paused = False  # Reset paused state
     if current_index > 0:
         current_index -= 1
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
     else:
         current_index = len(audio_files) - 1
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
 
 def stop_music():
     global is_paused
+    if not _mixer_ready:
+        return
     pygame.mixer.music.stop()
+    pygame.event.clear(MUSIC_END)  # An explicit stop should not advance the playlist
     is_paused = False
 
 def pause_music():
     global is_paused
+    if not _mixer_ready:
+        return
     if not is_paused:
         pygame.mixer.music.pause()
         is_paused = True
@@ -229,12 +253,34 @@ def pause_music():
         pygame.mixer.music.unpause()
         is_paused = False
 
+# Resolve every track's .srt sidecar once per list load from the directory
+# listing in names; durations are probed lazily by _prefetch
+def _build_meta(names):
+    global _meta
+    _meta = []
+    for path in audio_files:
+        srt = os.path.splitext(path)[0] + ".srt"
+        _meta.append([srt if os.path.basename(srt) in names else None, None])
+
+# Read the SRT and probe the duration on a worker so the Tk thread never
+# waits on the disk; results land in the _load_srt/_duration_ms caches
+_IO = ThreadPoolExecutor(max_workers=2)
+
+def _probe(path, srt):
+    if srt is not None:
+        load_srt(srt, os.path.getmtime(srt))
+    return duration_ms(path, os.path.getmtime(path)) // 1000
+
+def _prefetch(index):
+    entry = _meta[index % len(_meta)]
+    if entry[1] is None:
+        entry[1] = _IO.submit(_probe, audio_files[index % len(_meta)], entry[0])
+
 def update_song_list():
     song_listbox.delete(1.0, tk.END)
     for i, file in enumerate(audio_files):
         song_name = os.path.basename(file)
-        srt_file_path = os.path.splitext(file)[0] + ".srt"
-        if os.path.exists(srt_file_path):
+        if _meta[i][0] is not None:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n", 'bold')
         else:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n")
@@ -243,7 +289,7 @@ def update_song_list():
 def on_song_select(event):
     global current_index
     current_index = int(event.widget.index("current").split('.')[0]) - 1
-    play_single_file(audio_files[current_index])
+    play_single_file(current_index)
 
 def highlight_current_song():
     def highlight():
@@ -291,4 +337,5 @@ song_listbox.tag_configure('highlight', background='yellow')
 song_listbox.bind('<Button-1>', on_song_select)
 
 # Run the Tkinter application
+root.after(50, _pump_pygame_events)
 root.mainloop()
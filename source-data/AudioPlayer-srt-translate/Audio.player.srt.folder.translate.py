@@ -1,16 +1,28 @@
 import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk
-from pydub import AudioSegment
-import threading
 import os
-import tempfile
-import time
-import re
+import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+from audio_player_core import EMPTY_CLOCK, load_srt, duration_ms, decode_to_wav_bytes
 from googletrans import Translator
 
-# Initialize pygame mixer
-pygame.mixer.init()
+# pygame.mixer 会启动音频线程，延迟到第一次播放时再初始化
+# 播放结束时发送 MUSIC_END 事件，由 Tk 主循环轮询
+MUSIC_END = pygame.USEREVENT + 1
+_mixer_ready = False
+
+def _mixer():
+    global _mixer_ready
+    if not _mixer_ready:
+        pygame.mixer.init()
+        pygame.display.init()  # 事件队列需要 video 子系统，但不会打开窗口
+        pygame.mixer.music.set_endevent(MUSIC_END)
+        _mixer_ready = True
+
+atexit.register(lambda: _mixer_ready and pygame.mixer.quit())
 
 # Initialize Tkinter application with ttk theme
 root = tk.Tk()
@@ -60,89 +72,180 @@ top_frame.grid_columnconfigure(1, weight=1)
 top_frame.grid_rowconfigure(0, weight=1)
 
 # Define global variables
-current_subtitles = []
+_clock = EMPTY_CLOCK  # 当前曲目的字幕；换曲时整体替换引用
 current_audio_file = None
 audio_files = []
+_meta = []  # 与 audio_files 对应的 [.srt 路径或 None, 探测时长的 future 或 None]
 current_index = -1
 current_duration = 0
+_wav_bio = None  # 播放期间保持内存中的 WAV 数据
 is_closing = False
 is_paused = False
 
-translator = Translator(service_urls=['translate.google.com'])  # 初始化翻译器
-
-# 定义解析 .srt 文件的函数
-def parse_srt(file_path):
-    subtitles = []
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        blocks = content.strip().split('\n\n')
-        for block in blocks:
-            lines = block.split('\n')
-            if len(lines) >= 3:
-                time_range = lines[1]
-                text = ' '.join(lines[2:])
-                start_time_str, end_time_str = time_range.split(' --> ')
-                start_time = parse_srt_time(start_time_str)
-                end_time = parse_srt_time(end_time_str)
-                subtitles.append((start_time, end_time, text))
-    return subtitles
-
-# 解析 .srt 文件中的时间格式 (hh:mm:ss,ms)
-def parse_srt_time(time_str):
-    hours, minutes, seconds = time_str.split(':')
-    seconds, milliseconds = seconds.split(',')
-    total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-    return total_seconds + int(milliseconds) / 1000
-
-# 定义更新字幕的函数
-def update_subtitles():
-    def update_text_area(text):
+# 每个线程第一次翻译时才创建自己的翻译器；显示与预翻译线程会同时发出请求
+_tr_local = threading.local()
+
+def _translator():
+    if not hasattr(_tr_local, 'translator'):
+        _tr_local.translator = Translator(service_urls=['translate.google.com'])
+    return _tr_local.translator
+
+def update_translated_text_area(translated_text):
+    translated_text_area.delete(1.0, tk.END)
+    translated_text_area.insert(tk.END, translated_text)
+
+# 翻译结果按原文缓存；显示与预翻译各用一个工作线程，网络延迟不会卡住字幕
+_tr_cache = {}
+_tr_pool = ThreadPoolExecutor(max_workers=1)
+_prewarm_pool = ThreadPoolExecutor(max_workers=1)
+_prewarm_gen = 0  # 每次切歌加一，旧曲目的预翻译随之停止
+
+def _translate_cached(text):
+    translated = _tr_cache.get(text)
+    if translated is None:
+        translated = _tr_cache[text] = _translator().translate(text, dest='zh-tw').text
+    return translated
+
+# 翻译字幕为繁体中文
+def translate_and_show(text):
+    try:
+        translated = _translate_cached(text)
+    except Exception as e:
+        print(f"翻译失败: {e}")
+        return
+    root.after(0, update_translated_text_area, translated)  # 更新翻译后的字幕区域
+
+# 播放时在后台预先翻译整首的字幕，字幕出现时直接命中缓存
+def _prewarm_translations(texts, gen):
+    for text in texts:
+        if gen != _prewarm_gen or is_closing:
+            return
+        try:
+            _translate_cached(text)
+        except Exception as e:
+            print(f"预翻译失败: {e}")
+            return
+
+# Subtitle tick on the Tk thread: look up the active cue and sleep until
+# the next cue starts instead of polling
+_last_shown_idx = -1
+_sub_job = None
+
+def sub_tick():
+    global _last_shown_idx, _sub_job
+    _sub_job = None
+    clock = _clock
+    if is_closing or not len(clock):
+        return
+    if is_paused:
+        _sub_job = root.after(250, sub_tick)
+        return
+    if not pygame.mixer.music.get_busy():
+        return
+    t = pygame.mixer.music.get_pos()  # Milliseconds, same unit as the cues
+    i, wait = clock.tick(t)
+    if i >= 0 and i != _last_shown_idx:
+        _last_shown_idx = i
+        text = clock.texts[i]
         text_area.delete(1.0, tk.END)
         text_area.insert(tk.END, text)
-
-    def update_translated_text_area(translated_text):
-        translated_text_area.delete(1.0, tk.END)
-        translated_text_area.insert(tk.END, translated_text)
-
-    while pygame.mixer.music.get_busy() and current_subtitles and not is_closing:
-        if is_paused:
-            time.sleep(0.5)
-            continue
-        current_time = pygame.mixer.music.get_pos() // 1000  # 将毫秒转换为秒
-        for start, end, text in current_subtitles:
-            if start <= current_time <= end:
-                root.after(0, update_text_area, text)  # 更新字幕区域的内容
-                # 翻译字幕为繁体中文
-                translated = translator.translate(text, dest='zh-tw').text
-                root.after(0, update_translated_text_area, translated)  # 更新翻译后的字幕区域
-                break
-        time.sleep(0.5)  # 每隔0.5秒检查一次时间
-
-# 定义更新进度条的函数
-def update_progress_bar():
-    while pygame.mixer.music.get_busy() and not is_closing:
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000  # 获取当前播放时间，转换为秒
-            root.after(0, progress_bar.config, {"value": current_time})  # 更新进度条
-        time.sleep(1)  # 每秒更新一次
+        # 在背景线程翻译，避免网络请求阻塞 UI
+        _tr_pool.submit(translate_and_show, text)
+    if wait is not None:
+        _sub_job = root.after(max(50, wait), sub_tick)
+
+def start_sub_tick():
+    global _last_shown_idx, _sub_job
+    if _sub_job is not None:
+        root.after_cancel(_sub_job)
+    _last_shown_idx = -1
+    _sub_job = root.after(0, sub_tick)
+
+# 在 Tk 线程上处理 pygame 事件，播放结束时调用 _on_music_end
+_on_music_end = None
+
+def _pump_pygame_events():
+    if is_closing:
+        return
+    if _mixer_ready:
+        pygame.event.pump()
+        if pygame.event.get(MUSIC_END) and _on_music_end is not None and not is_paused:
+            _on_music_end()
+    root.after(50, _pump_pygame_events)
+
+# Progress bar tick on the Tk thread
+_progress_job = None
+_last_progress = -1  # 上次写入进度条的秒数，未变化时不重绘
+
+def progress_tick():
+    global _progress_job, _last_progress
+    _progress_job = None
+    if is_closing:
+        return
+    if not is_paused:
+        if not pygame.mixer.music.get_busy():
+            return
+        pos = pygame.mixer.music.get_pos() // 1000
+        if pos != _last_progress:
+            _last_progress = pos
+            progress_bar["value"] = pos  # 更新进度条
+    _progress_job = root.after(1000, progress_tick)
+
+def start_progress_tick():
+    global _progress_job, _last_progress
+    if _progress_job is not None:
+        root.after_cancel(_progress_job)
+    _last_progress = -1
+    _progress_job = root.after(0, progress_tick)
+
+# 载入文件夹时用目录文件名集合 names 查表得出每首歌的 .srt 路径
+def _build_meta(names):
+    global _meta
+    _meta = []
+    for path in audio_files:
+        srt = os.path.splitext(path)[0] + ".srt"
+        _meta.append([srt if os.path.basename(srt) in names else None, None])
+
+# 在后台线程读取字幕与时长并填入缓存，UI 线程不必等待磁盘
+_IO = ThreadPoolExecutor(max_workers=2)
+
+def _probe(path, srt):
+    if srt is not None:
+        load_srt(srt, os.path.getmtime(srt))
+    return duration_ms(path, os.path.getmtime(path)) // 1000
+
+def _prefetch(index):
+    entry = _meta[index % len(_meta)]
+    if entry[1] is None:
+        entry[1] = _IO.submit(_probe, audio_files[index % len(_meta)], entry[0])
 
 # 定义更新歌曲列表的函数
 def update_song_list():
     song_listbox.delete(1.0, tk.END)  # 清空当前列表
     for i, file in enumerate(audio_files):
         song_name = os.path.basename(file)
-        srt_file_path = os.path.splitext(file)[0] + ".srt"
-        if os.path.exists(srt_file_path):
+        if _meta[i][0] is not None:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n", 'bold')  # 使用加粗显示
         else:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n")
     highlight_current_song()  # 高亮当前歌曲
 
 # 定义播放单个音频文件的函数
-def play_single_file(file_path):
-    global current_subtitles, current_audio_file, current_index, current_duration, is_paused, temp_wav_file
+def play_single_file(index):
+    global _clock, current_audio_file, current_index, current_duration, is_paused, _prewarm_gen
+    file_path = audio_files[index]
+    _prefetch(index)
+    srt_file_path, probe = _meta[index]
+    try:
+        current_duration = probe.result()  # 一般已由预取完成
+    except Exception as e:
+        print(f"无法读取 {file_path} 的时长: {e}")
+        current_duration = 0
+    _prefetch(index + 1)  # 顺便预取前后两首
+    _prefetch(index - 1)
     current_audio_file = file_path
     is_paused = False  # 重置暂停状态
+    _mixer()
 
     # 清空字幕区域
     def clear_text_areas():
@@ -152,81 +255,48 @@ def play_single_file(file_path):
     root.after(0, clear_text_areas)  # 使用 root.after 保证在主线程上清空字幕区域
 
     # 查找与音频文件同名的 .srt 文件并显示其内容
-    srt_file_path = os.path.splitext(file_path)[0] + ".srt"
-    current_subtitles = []
-    if os.path.exists(srt_file_path):
-        current_subtitles = parse_srt(srt_file_path)
+    _clock = EMPTY_CLOCK
+    if srt_file_path is not None:
+        _clock = load_srt(srt_file_path, os.path.getmtime(srt_file_path))
+        _prewarm_gen += 1
+        _prewarm_pool.submit(_prewarm_translations, _clock.texts, _prewarm_gen)
     else:
         def no_srt_message():
             text_area.insert(tk.END, "No associated .srt file found.")
             translated_text_area.insert(tk.END, "未找到相关的 .srt 字幕文件。")
         root.after(0, no_srt_message)  # 显示没有 .srt 文件的消息
 
-    # 获取音频文件的时长
-    if file_path.lower().endswith(('.mp3', '.m4a', '.wav')):
-        audio = AudioSegment.from_file(file_path)
-        current_duration = len(audio) // 1000  # 时长以秒为单位
-        progress_bar["maximum"] = current_duration
+    progress_bar["maximum"] = current_duration
 
-    # 播放音频文件
-    if file_path.lower().endswith('.mp3'):
+    # 播放音频文件；.mp3 与 .wav 由 pygame 直接播放，不经过任何转换
+    if file_path.lower().endswith(('.mp3', '.wav')):
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()  # 更新字幕
-        threading.Thread(target=update_progress_bar).start()  # 更新进度条
+        pygame.event.clear(MUSIC_END)  # 切歌时中断旧曲目也会发送该事件
+        start_sub_tick()  # 更新字幕
+        start_progress_tick()  # 更新进度条
     elif file_path.lower().endswith('.m4a'):
         play_m4a(file_path)
-    elif file_path.lower().endswith('.wav'):
-        pygame.mixer.music.load(file_path)
-        pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()
-        threading.Thread(target=update_progress_bar).start()
 
     highlight_current_song()
 
 # 定义处理 .m4a 文件的函数
 def play_m4a(file_path):
-    global current_subtitles, current_audio_file, current_duration, is_paused, temp_wav_file
+    global current_audio_file, is_paused, _wav_bio
     current_audio_file = file_path
     is_paused = False  # 重置暂停状态
-
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # 关闭文件以便其他进程使用
-    audio.export(temp_wav_file.name, format="wav")  # 将 .m4a 文件转换为 .wav
-    current_duration = len(audio) // 1000  # 时长以秒为单位
-    progress_bar["maximum"] = current_duration
-
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        if current_subtitles:
-            threading.Thread(target=update_subtitles).start()  # 更新字幕
-        threading.Thread(target=update_progress_bar).start()  # 更新进度条
-
-        # 播放结束后删除临时文件
-        def cleanup():
-            global is_closing
-            while True:
-                if is_paused or is_closing:
-                    pygame.time.wait(100)
-                    continue
-                pos = pygame.mixer.music.get_pos()
-                if pos == -1 or is_closing:
-                    break
-                pygame.time.wait(100)
-            pygame.mixer.music.stop()  # 停止音乐播放
-            pygame.mixer.music.unload()  # 卸载音乐，释放文件资源
-            try:
-                os.remove(temp_wav_file.name)  # 删除临时文件
-            except PermissionError:
-                time.sleep(0.1)
-                os.remove(temp_wav_file.name)
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"无法创建临时文件: {temp_wav_file.name}")
+    _mixer()
+
+    try:
+        _wav_bio = decode_to_wav_bytes(file_path)  # 在内存中将 .m4a 解码为 .wav
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"无法解码 {file_path}: {e}")
+        return
+    pygame.mixer.music.load(_wav_bio)
+    pygame.mixer.music.play()
+    pygame.event.clear(MUSIC_END)  # 切歌时中断旧曲目也会发送该事件
+    start_sub_tick()  # 更新字幕
+    start_progress_tick()  # 更新进度条
 
 # 定义高亮当前歌曲的函数
 def highlight_current_song():
@@ -239,6 +309,8 @@ def highlight_current_song():
 # 定义暂停/继续播放的函数
 def pause_music():
     global is_paused
+    if not _mixer_ready:
+        return
     if is_paused:
         pygame.mixer.music.unpause()  # 恢复播放
         pause_button.config(text="Pause")  # 将按钮文本改回 "Pause"
@@ -254,10 +326,10 @@ def next_music():
     is_paused = False  # 重置暂停状态
     if current_index >= 0 and current_index < len(audio_files) - 1:
         current_index += 1
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
     else:
         current_index = 0  # 从第一首歌开始
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
 
 # 定义播放上一首音乐的函数
 def previous_music():
@@ -265,45 +337,36 @@ def previous_music():
     is_paused = False  # 重置暂停状态
     if current_index > 0:
         current_index -= 1
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
     else:
         current_index = len(audio_files) - 1  # 从最后一首歌开始
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
 
 # 定义函数来播放整个文件夹中的音频文件
 def play_directory():
     global audio_files, current_index
     directory_path = filedialog.askdirectory()
     if directory_path:
-        # Get all .mp3, .m4a, and .wav files in the directory
-        audio_files = sorted([os.path.join(directory_path, f) for f in os.listdir(directory_path) if f.lower().endswith(('.mp3', '.m4a', '.wav'))])
+        # Get all .mp3, .m4a, and .wav files in the directory (one directory read)
+        with os.scandir(directory_path) as it:
+            names = {e.name for e in it if e.is_file()}
+        audio_files = sorted(os.path.join(directory_path, n) for n in names if n.lower().endswith(('.mp3', '.m4a', '.wav')))
         if audio_files:
             current_index = 0  # Start from the first file
+            _build_meta(names)
             play_audio_files_sequentially(audio_files)
             update_song_list()
 
 # 播放文件夹中的音频文件，按顺序播放
 def play_audio_files_sequentially(audio_files):
+    global _on_music_end
     def play_next(index):
         if index < len(audio_files) and not is_closing:
             global current_index
             current_index = index
-            file_path = audio_files[index]
-            play_single_file(file_path)
-            # Set event to play the next file after the current one finishes
-            def on_music_end():
-                global is_closing
-                while True:
-                    if is_paused or is_closing:
-                        pygame.time.wait(100)
-                        continue
-                    pos = pygame.mixer.music.get_pos()
-                    if pos == -1 or is_closing:
-                        break
-                    pygame.time.wait(100)
-                if not is_closing:
-                    root.after(0, play_next, (index + 1) % len(audio_files))
-            threading.Thread(target=on_music_end).start()
+            play_single_file(index)
+    # 当前歌曲播放结束后自动播放下一首
+    _on_music_end = lambda: play_next((current_index + 1) % len(audio_files))
     play_next(0)
 
 # 定义处理歌曲选择的函数
@@ -313,13 +376,16 @@ def on_song_select(event):
     index = int(event.widget.index("current").split('.')[0]) - 1
     if 0 <= index < len(audio_files):
         current_index = index
-        play_single_file(audio_files[current_index])
+        play_single_file(current_index)
 
 # 定义关闭程序的函数
 def close_program():
     global is_closing
     is_closing = True  # 设置标志，表示程序正在关闭
-    pygame.mixer.music.stop()  # 停止音乐播放
+    if _mixer_ready:
+        pygame.mixer.music.stop()  # 停止音乐播放
+    _tr_pool.shutdown(wait=False, cancel_futures=True)  # 丢弃尚未开始的翻译
+    _prewarm_pool.shutdown(wait=False, cancel_futures=True)
     root.destroy()  # 关闭 Tkinter 应用窗口
 
 # 添加控制按钮，移除了 Play 按钮
@@ -342,9 +408,7 @@ close_button.grid(row=0, column=4, padx=5)
 progress_frame = tk.Frame(bottom_frame, bg=primary_color)
 progress_frame.pack(pady=10, padx=10, fill=tk.X)
 
-progress_bar_style = ttk.Style()
-progress_bar_style.theme_use('clam')
-progress_bar_style.configure("Custom.Horizontal.TProgressbar", troughcolor=secondary_color, background=accent_color)
+style.configure("Custom.Horizontal.TProgressbar", troughcolor=secondary_color, background=accent_color)
 
 progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=400, mode="determinate", style="Custom.Horizontal.TProgressbar")
 progress_bar.pack(fill=tk.X, expand=True)
@@ -363,4 +427,5 @@ song_listbox.config(yscrollcommand=song_list_scrollbar.set)
 song_list_scrollbar.config(command=song_listbox.yview)
 
 # Run the Tkinter application
+root.after(50, _pump_pygame_events)
 root.mainloop()
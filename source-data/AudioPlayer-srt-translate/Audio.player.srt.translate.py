@@ -1,16 +1,20 @@
 import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext
-from pydub import AudioSegment
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import io
 import os
+import sys
 import tempfile
+import atexit
 import time
 import re
+import numpy as np
 from googletrans import Translator  # 引入翻譯庫
-from googletrans.gtoken import TokenAcquirer
+from translation_store import TranslationCache, TranslationStore
 
-translator = Translator()
 # Initialize pygame mixer
 pygame.mixer.init()
 
@@ -49,97 +53,235 @@ text_area_zh.pack(pady=10)
 is_paused = False
 is_playing = False
 current_file = None
-subtitles_thread = None
-translator = Translator()  # 初始化翻譯器
+# 每個執行緒各自一個翻譯器（各自的 HTTP 連線）；預翻譯執行緒與預取工作執行緒會同時送出請求
+translator_local = threading.local()
 
-
-
-
-# Update the subtitles displayed in the text areas (both English and Chinese)
-def update_subtitles(subtitles):
-    global is_paused
-    while pygame.mixer.music.get_busy() or is_paused:
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            for start, end, text in subtitles:
-                if start <= current_time <= end:
-                    # 顯示英文字幕
-                    text_area_en.delete(1.0, tk.END)
-                    text_area_en.insert(tk.END, text)
-
-                    # 顯示翻譯後的中文字幕
-                    translated_text = None
-                    attempts = 0
-                    max_attempts = 3
-
-                    while attempts < max_attempts:
-                        try:
-                            translated_text = translator.translate(text, src='en', dest='zh-tw').text  # 翻譯字幕
-                            break  # 成功翻譯，跳出循環
-                        except Exception as e:
-                            print(f"翻譯失敗，重試中...（第 {attempts + 1} 次）")
-                            time.sleep(2)  # 等待2秒後重試
-                            attempts += 1
-
-                    if translated_text:
-                        text_area_zh.delete(1.0, tk.END)
-                        text_area_zh.insert(tk.END, translated_text)
-                    else:
-                        text_area_zh.delete(1.0, tk.END)
-                        text_area_zh.insert(tk.END, "翻譯失敗。")
-                    break
-        time.sleep(0.5)
+def get_translator():
+    if not hasattr(translator_local, 'translator'):
+        translator_local.translator = Translator()
+    return translator_local.translator
+
+# 翻譯快取：載入字幕後在背景翻譯一次，播放時只查表；成功的翻譯另存到磁碟，下次開啟直接讀取
+translation_cache = TranslationCache()
+translation_store = TranslationStore('zh-tw')
+
+# 每批最多 50 條、約 4500 字，以換行串接後一次請求，減少往返次數
+BATCH_CUES = 50
+BATCH_CHARS = 4500
+
+
+def batches(texts):
+    batch, size = [], 0
+    for text in texts:
+        if batch and (len(batch) >= BATCH_CUES or size + len(text) > BATCH_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        yield batch
+
+
+# 翻譯失敗不寫入快取，只記下失敗時間；RETRY_AFTER 秒後預取或顯示時會再試
+TRANSLATE_ATTEMPTS = 3
+RETRY_AFTER = 10
+translation_failures = {}  # text -> 最後一次失敗的 time.monotonic()
+
+
+def needs_translation(text):
+    return (text not in translation_cache and text not in in_flight
+            and time.monotonic() - translation_failures.get(text, -RETRY_AFTER) >= RETRY_AFTER)
+
+
+# 翻譯一批字幕並寫入快取；成功的結果另存到磁碟。失敗時重試，最後仍失敗則留待之後再翻譯
+def translate_batch(batch):
+    for attempt in range(1, TRANSLATE_ATTEMPTS + 1):
+        try:
+            translator = get_translator()
+            results = translator.translate('\n'.join(batch), src='en', dest='zh-tw').text.split('\n')
+            if len(results) != len(batch):  # 換行被合併時改為逐條翻譯
+                results = [translator.translate(t, src='en', dest='zh-tw').text for t in batch]
+            break
+        except Exception as e:
+            print(f"翻譯失敗（第 {attempt} 次）: {e}")
+            if attempt == TRANSLATE_ATTEMPTS:
+                failed_at = time.monotonic()
+                translation_failures.update((t, failed_at) for t in batch)
+                return
+            time.sleep(attempt)
+    translation_store.put(zip(batch, results))
+    translation_cache.update(zip(batch, results))
+    for t in batch:
+        translation_failures.pop(t, None)
+
+
+def pretranslate(subtitles, file_path):
+    texts = [t for t in dict.fromkeys(subtitles[2]) if t not in translation_cache]
+    translation_cache.update(translation_store.load(texts))
+    pending = [t for t in texts if t not in translation_cache]
+    for batch in batches(pending):
+        if current_file != file_path:  # 已換成別的檔案
+            return
+        batch = [t for t in batch if needs_translation(t)]
+        if batch:
+            translate_batch(batch)
+
+
+# 預取視窗：每進入新的一句，就把後面 PREFETCH_CUES 句中還沒翻譯的先交給執行緒池，不必等 pretranslate 排到
+PREFETCH_CUES = 8
+prefetch_pool = ThreadPoolExecutor(max_workers=2)
+in_flight = set()  # 正在預取的字幕，避免重複送出
+
+
+def prefetch_translations(texts, i):
+    batch = [t for t in dict.fromkeys(texts[max(i, 0):i + 1 + PREFETCH_CUES]) if needs_translation(t)]
+    if batch:
+        in_flight.update(batch)
+        prefetch_pool.submit(prefetch_batch, batch)
+
+
+def prefetch_batch(batch):
+    try:
+        translate_batch(batch)
+    finally:
+        in_flight.difference_update(batch)
+
+
+# 時間行的格式，模組載入時只編譯一次
+SRT_TIME_RE = re.compile(r'(\d+):(\d\d):(\d\d),(\d+)\s*-->\s*(\d+):(\d\d):(\d\d),(\d+)')
+
+
+# 讀取字幕檔的緩衝區上限，大檔案只需少數幾次系統呼叫
+READ_BUFFER = 16 << 20
+
+
+# 逐行讀取字幕檔，每遇到空行就產生一句 (時間欄位, text)，不必先把整個檔案讀進記憶體
+# 時間欄位是開始、結束各自的 時、分、秒、毫秒 字串，由 parse_srt 一次換算
+def iter_srt(file_path):
+    buffering = max(io.DEFAULT_BUFFER_SIZE, min(os.path.getsize(file_path), READ_BUFFER))
+    with open(file_path, 'r', encoding='utf-8', buffering=buffering) as file:
+        block = []
+        for line in file:
+            line = line.rstrip('\n')
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield from srt_cue(block)
+                block = []
+        yield from srt_cue(block)
+
+
+# 從一個字幕區塊取出時間行與其後的文字；沒有文字的區塊略過
+def srt_cue(lines):
+    for i, line in enumerate(lines):
+        m = SRT_TIME_RE.match(line)
+        if m:
+            if i + 1 < len(lines):
+                yield m.groups(), ' '.join(lines[i + 1:])
+            return
 
 
 # Define a function to parse .srt files for subtitles
+# 回傳 (starts, ends, texts)：按開始時間排序的時間陣列（秒）與對應文字
 def parse_srt(file_path):
-    subtitles = []
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        blocks = content.strip().split('\n\n')
-        for block in blocks:
-            lines = block.split('\n')
-            if len(lines) >= 3:
-                time_range = lines[1]
-                text = ' '.join(lines[2:])
-                start_time_str, end_time_str = time_range.split(' --> ')
-                start_time = parse_srt_time(start_time_str)
-                end_time = parse_srt_time(end_time_str)
-                subtitles.append((start_time, end_time, text))
-    return subtitles
-
-
-# Parse the time format used in .srt files (hh:mm:ss,ms)
-def parse_srt_time(time_str):
-    hours, minutes, seconds = time_str.split(':')
-    seconds, milliseconds = seconds.split(',')
-    total_seconds = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-    return total_seconds + int(milliseconds) / 1000
-
-
-# Update the subtitles displayed in the text areas (both English and Chinese)
-def update_subtitles(subtitles):
-    global is_paused
-    while pygame.mixer.music.get_busy() or is_paused:
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000
-            for start, end, text in subtitles:
-                if start <= current_time <= end:
-                    # 顯示英文字幕
-                    text_area_en.delete(1.0, tk.END)
-                    text_area_en.insert(tk.END, text)
-
-                    # 顯示翻譯後的中文字幕
-                    translated_text = translator.translate(text, src='en', dest='zh-tw').text  # 翻譯字幕
-                    text_area_zh.delete(1.0, tk.END)
-                    text_area_zh.insert(tk.END, translated_text)
-                    break
-        time.sleep(0.5)
+    fields, texts = [], []
+    for time_fields, text in iter_srt(file_path):
+        fields.append(time_fields)
+        texts.append(sys.intern(text))  # 重複的台詞只保留一份，查快取時也能先比對指標
+    # 所有時間一次用 numpy 換算成秒 (hh:mm:ss,ms)
+    t = np.array(fields, dtype=np.int64).reshape(-1, 8)
+    starts = t[:, 0] * 3600 + t[:, 1] * 60 + t[:, 2] + t[:, 3] / 1000
+    ends = t[:, 4] * 3600 + t[:, 5] * 60 + t[:, 6] + t[:, 7] / 1000
+    order = np.argsort(starts, kind='stable')
+    return starts[order], ends[order], [texts[i] for i in order]
+
+
+# 播放位置：開始或繼續播放時以 get_pos() 對齊 monotonic 時鐘，之後直接推算，每 5 秒再校正一次
+CLOCK_SYNC_INTERVAL = 5
+play_t0 = 0.0  # 播放位置為 0 時對應的 monotonic 時間
+last_sync = 0.0
+
+
+def sync_clock():
+    global play_t0, last_sync
+    last_sync = time.monotonic()
+    play_t0 = last_sync - pygame.mixer.music.get_pos() / 1000
+
+
+def playback_position():
+    if time.monotonic() - last_sync >= CLOCK_SYNC_INTERVAL:
+        sync_clock()
+    return time.monotonic() - play_t0
+
+
+# 字幕計時：在 Tk 主迴圈中執行，找出目前的字幕後睡到下一句開始，不再用執行緒輪詢
+sub_job = None
+last_cue = -1  # 上一次找到的字幕索引
+shown_text = shown_translation = None  # 目前畫面上的字幕，內容不變時不重繪
+
+
+# 目前時間所在的字幕索引（尚未開始時為 -1）；多數時候仍在上一句或剛進入下一句，先檢查這兩句
+def find_cue(starts, t):
+    n = len(starts)
+    for i in (last_cue, last_cue + 1):
+        if 0 <= i < n and starts[i] <= t and (i + 1 == n or t < starts[i + 1]):
+            return i
+    return int(np.searchsorted(starts, t, side='right')) - 1
+
+
+def sub_tick(subtitles):
+    global sub_job, last_cue, shown_text, shown_translation
+    sub_job = None
+    if is_paused:
+        sub_job = root.after(250, sub_tick, subtitles)
+        return
+    if not pygame.mixer.music.get_busy():
+        return
+    starts, ends, texts = subtitles
+    current_time = playback_position()
+    i = find_cue(starts, current_time)
+    if i != last_cue or (i >= 0 and needs_translation(texts[i])):
+        prefetch_translations(texts, i)  # 包含目前這句：先前翻譯失敗的會在這裡重試
+    last_cue = i
+    wait = None
+    if i >= 0 and current_time <= ends[i]:
+        text = texts[i]
+        # 顯示英文字幕
+        if text != shown_text:
+            shown_text = text
+            text_area_en.replace(1.0, tk.END, text)
+
+        # 顯示翻譯後的中文字幕（由 pretranslate 預先填入快取）
+        translated_text = translation_cache.get(text)
+        if translated_text is None:
+            translated_text = "翻譯失敗。" if text in translation_failures else "…翻譯中"
+        if translated_text != shown_translation:
+            shown_translation = translated_text
+            text_area_zh.replace(1.0, tk.END, translated_text)
+        if text not in translation_cache:
+            wait = 0.5  # 翻譯尚未完成，稍後再更新
+    if i + 1 < len(starts):
+        until_next = starts[i + 1] - current_time
+        wait = until_next if wait is None else min(wait, until_next)
+    if wait is not None:
+        sub_job = root.after(max(50, int(wait * 1000)), sub_tick, subtitles)
+
+
+def start_sub_tick(subtitles):
+    global sub_job, last_cue, shown_text, shown_translation
+    if sub_job is not None:
+        root.after_cancel(sub_job)
+        sub_job = None
+    last_cue = -1
+    shown_text = shown_translation = None
+    sync_clock()
+    if subtitles:
+        sub_job = root.after(0, sub_tick, subtitles)
 
 
 # Define functions to control the music player
 def play_music():
-    global current_file, subtitles_thread, is_playing
+    global current_file, is_playing
     file_path = filedialog.askopenfilename(filetypes=[("Audio Files", "*.mp3 *.m4a")])
     if file_path:
         current_file = file_path
@@ -147,9 +289,10 @@ def play_music():
 
         # Look for a .srt file with the same name and display its contents
         srt_file_path = os.path.splitext(file_path)[0] + ".srt"
-        subtitles = []
+        subtitles = None
         if os.path.exists(srt_file_path):
             subtitles = parse_srt(srt_file_path)
+            threading.Thread(target=pretranslate, args=(subtitles, file_path), daemon=True).start()
         else:
             text_area_en.delete(1.0, tk.END)
             text_area_zh.delete(1.0, tk.END)
@@ -160,49 +303,65 @@ def play_music():
         if file_path.endswith('.mp3'):
             pygame.mixer.music.load(file_path)
             pygame.mixer.music.play()
-            if subtitles:
-                subtitles_thread = threading.Thread(target=update_subtitles, args=(subtitles,))
-                subtitles_thread.start()
+            start_sub_tick(subtitles)
         elif file_path.endswith('.m4a'):
             play_m4a(file_path, subtitles)
 
 
-def play_m4a(file_path, subtitles):
-    global subtitles_thread, is_playing
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # Close the file so that it can be used by other processes
-    audio.export(temp_wav_file.name, format="wav")
-
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        is_playing = True
-        if subtitles:
-            subtitles_thread = threading.Thread(target=update_subtitles, args=(subtitles,))
-            subtitles_thread.start()
+# 所有 .m4a 共用同一個暫存 WAV 檔，每次轉檔直接覆寫，程式結束時才刪除
+WAV_SLOT = os.path.join(tempfile.gettempdir(), f'audioplayer_{os.getpid()}.wav')
+
 
-        # Delete the temporary file after playback is complete
-        def cleanup():
-            # 等待音樂播放結束
-            while pygame.mixer.music.get_busy() or is_paused:  # 確保暫停時不刪除
-                pygame.time.wait(100)
+def remove_wav_slot():
+    try:
+        os.remove(WAV_SLOT)
+    except OSError:
+        pass  # 檔案不存在或仍被佔用時略過
 
-            # 停止音樂播放並確保資源已釋放
-            pygame.mixer.music.stop()
-            # 等待一小段時間以確保資源完全釋放
-            time.sleep(2)
 
-            # 刪除臨時文件
-            try:
-                os.remove(temp_wav_file.name)
-                print(f"Temporary file removed: {temp_wav_file.name}")
-            except PermissionError:
-                print(f"Failed to remove temporary file: {temp_wav_file.name}")
+atexit.register(remove_wav_slot)
 
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"Failed to create temporary file: {temp_wav_file.name}")
+convert_proc = None  # 目前的 ffmpeg 轉檔程序
+
+
+# 用 ffmpeg 轉成 WAV，在背景執行緒等待，介面不會卡住；轉好後回到 Tk 執行緒播放
+def play_m4a(file_path, subtitles):
+    global convert_proc
+    pygame.mixer.music.stop()
+    pygame.mixer.music.unload()  # 釋放暫存檔才能覆寫
+    if convert_proc is not None and convert_proc.poll() is None:
+        convert_proc.kill()  # 上一個轉檔已經用不到
+        convert_proc.wait()
+    try:
+        proc = convert_proc = subprocess.Popen(['ffmpeg', '-nostdin', '-v', 'quiet', '-y', '-i', file_path,
+                                                '-acodec', 'pcm_s16le', '-f', 'wav', WAV_SLOT])
+    except OSError as e:
+        print(f"Failed to convert {file_path}: {e}")
+        return
+    if subtitles:
+        text_area_en.delete(1.0, tk.END)
+        text_area_en.insert(tk.END, "Loading…")
+
+    def convert():
+        if proc.wait() == 0:
+            root.after(0, play_converted, file_path, proc, subtitles)
+        elif proc is convert_proc:
+            print(f"Failed to convert {file_path}: ffmpeg exited with {proc.returncode}")
+
+    threading.Thread(target=convert, daemon=True).start()
+
+
+def play_converted(file_path, proc, subtitles):
+    global is_playing
+    if proc is not convert_proc or current_file != file_path:  # 轉檔期間已選了別的檔案
+        return
+    if subtitles:
+        text_area_en.delete(1.0, tk.END)
+
+    pygame.mixer.music.load(WAV_SLOT)
+    pygame.mixer.music.play()
+    is_playing = True
+    start_sub_tick(subtitles)
 
 
 # Modify the pause function to toggle between pause and resume
@@ -214,12 +373,18 @@ def pause_resume_music():
             is_paused = True
         else:
             pygame.mixer.music.unpause()
+            sync_clock()
             is_paused = False
 
 
 # Define function to close the application
 def close_application():
     pygame.mixer.music.stop()  # 停止播放音樂
+    pygame.mixer.music.unload()  # 釋放 WAV_SLOT 的檔案控制代碼
+    if convert_proc is not None and convert_proc.poll() is None:
+        convert_proc.kill()
+    prefetch_pool.shutdown(wait=False, cancel_futures=True)
+    translation_store.close()
     root.destroy()  # 關閉 Tkinter 視窗，結束應用程式
 
 
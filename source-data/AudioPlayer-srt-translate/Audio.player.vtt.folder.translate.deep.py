@@ -1,16 +1,30 @@
 import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk
-from pydub import AudioSegment
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+import functools
+import subprocess
+import io
 import os
+import sys
 import tempfile
+import atexit
 import time
 import re
+import numpy as np
+import requests
 from deep_translator import GoogleTranslator
+from deep_translator import google as deep_google
+from translation_store import TranslationCache, TranslationStore
+from audio_player_core import duration_ms
 
 # Initialize pygame mixer
+# 曲目播放结束时 pygame 发出 MUSIC_END 事件，由 Tk 主循环取出处理，不再用线程轮询
+MUSIC_END = pygame.USEREVENT + 1
 pygame.mixer.init()
+pygame.display.init()  # 事件队列需要 video 子系统，不会打开窗口
+pygame.mixer.music.set_endevent(MUSIC_END)
 
 # Initialize Tkinter application with ttk theme
 root = tk.Tk()
@@ -60,111 +74,228 @@ top_frame.grid_columnconfigure(1, weight=1)
 top_frame.grid_rowconfigure(0, weight=1)
 
 # 定义全局变量
-current_subtitles = []
+current_subtitles = None  # (starts, ends, texts)，没有字幕时为 None
 current_audio_file = None
 audio_files = []
 current_index = -1
 current_duration = 0
 is_closing = False
 is_paused = False
+is_loading = False  # .m4a 正在后台转换
+on_music_end = None  # 曲目播放结束时调用
 
-# 初始化翻译器，目标语言代码改为 'zh-TW'
-translator = GoogleTranslator(source='auto', target='zh-TW')
-
-# 创建翻译器的线程锁
-translator_lock = threading.Lock()
-
-# 创建翻译缓存
-translation_cache = {}
+# deep_translator 每次翻译都调用 requests.get，每次都重新建立 TCP/TLS 连接；
+# 换成共享的 Session，连接保持复用
+http_session = requests.Session()
+http_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+deep_google.requests = http_session
 
-# 定义解析 .vtt 文件的函数
+# 初始化翻译器，目标语言代码改为 'zh-TW'
+# GoogleTranslator 在对象上暂存请求参数，不能被多个线程同时使用；每个线程各建一个，请求可以并行
+translator_local = threading.local()
+
+def get_translator():
+    if not hasattr(translator_local, 'translator'):
+        translator_local.translator = GoogleTranslator(source='auto', target='zh-TW')
+    return translator_local.translator
+
+# 创建翻译缓存（有上限，线程安全）；成功的翻译另存到磁盘，下次打开直接读取
+translation_cache = TranslationCache()
+translation_store = TranslationStore('zh-TW')
+
+# 每批最多 50 条、约 4500 字，以换行串接后一次请求，减少往返次数
+BATCH_CUES = 50
+BATCH_CHARS = 4500
+
+def batches(texts):
+    batch, size = [], 0
+    for text in texts:
+        if batch and (len(batch) >= BATCH_CUES or size + len(text) > BATCH_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        yield batch
+
+# 翻译一批字幕并写入缓存；成功的结果另存到磁盘
+def translate_batch(batch):
+    translator = get_translator()
+    try:
+        results = translator.translate('\n'.join(batch)).split('\n')
+        if len(results) != len(batch):  # 换行被合并时改为逐条翻译
+            results = [translator.translate(t) for t in batch]
+        translation_store.put(zip(batch, results))
+    except Exception as e:
+        print(f"翻译错误: {e}")
+        results = ["翻譯失敗"] * len(batch)
+    translation_cache.update(zip(batch, results))
+
+# 载入字幕后在背景翻译一次，播放时只查缓存；换曲后停止旧曲目的翻译
+def pretranslate(subtitles):
+    texts = [t for t in dict.fromkeys(subtitles[2]) if t not in translation_cache]
+    translation_cache.update(translation_store.load(texts))
+    pending = [t for t in texts if t not in translation_cache]
+    for batch in batches(pending):
+        if subtitles is not current_subtitles or is_closing:
+            return
+        batch = [t for t in batch if t not in translation_cache and t not in in_flight]
+        if batch:
+            translate_batch(batch)
+
+# 预取窗口：每进入新的一句，就把后面 PREFETCH_CUES 句中还没翻译的先交给线程池，不必等 pretranslate 排到
+PREFETCH_CUES = 8
+prefetch_pool = ThreadPoolExecutor(max_workers=2)
+in_flight = set()  # 正在预取的字幕，避免重复送出
+
+def prefetch_translations(texts, i):
+    batch = [t for t in dict.fromkeys(texts[i + 1:i + 1 + PREFETCH_CUES])
+             if t not in translation_cache and t not in in_flight]
+    if batch:
+        in_flight.update(batch)
+        prefetch_pool.submit(prefetch_batch, batch)
+
+def prefetch_batch(batch):
+    try:
+        translate_batch(batch)
+    finally:
+        in_flight.difference_update(batch)
+
+# 时间行的格式：小时可省略，时间后可带 cue 设置。模块载入时只编译一次
+VTT_TIME_RE = re.compile(r'(?:(\d+):)?(\d\d):(\d\d)[.,](\d+)\s*-->\s*(?:(\d+):)?(\d\d):(\d\d)[.,](\d+)')
+
+# 读取字幕文件的缓冲区上限，大文件只需少数几次系统调用
+READ_BUFFER = 16 << 20
+
+# 逐行读取字幕文件，每遇到空行就产生一句 (时间字段, text)，不必先把整个文件读进内存
+# 时间字段是开始、结束各自的 时、分、秒、毫秒 字符串，由 parse_vtt 一次换算
+def iter_vtt(file_path):
+    buffering = max(io.DEFAULT_BUFFER_SIZE, min(os.path.getsize(file_path), READ_BUFFER))
+    with open(file_path, 'r', encoding='utf-8-sig', buffering=buffering) as file:
+        block = []
+        for line in file:
+            line = line.rstrip('\n')
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield from vtt_cue(block)
+                block = []
+        yield from vtt_cue(block)
+
+# 从一个区块取出时间行与其后的文字；WEBVTT 头、NOTE 和没有文字的区块没有时间行，直接略过
+def vtt_cue(lines):
+    for i, line in enumerate(lines):
+        m = VTT_TIME_RE.match(line)
+        if m:
+            if i + 1 < len(lines):
+                h1, m1, s1, f1, h2, m2, s2, f2 = m.groups('0')  # 省略的小时记为 0
+                # 小数部分补齐/截成三位毫秒
+                yield (h1, m1, s1, f1.ljust(3, '0')[:3], h2, m2, s2, f2.ljust(3, '0')[:3]), ' '.join(lines[i + 1:])
+            return
+
+# 定义解析 .vtt 文件的函数，返回 (starts, ends, texts)：按开始时间排序的时间数组（秒）与对应文字
 def parse_vtt(file_path):
-    subtitles = []
-    with open(file_path, 'r', encoding='utf-8-sig') as file:
-        content = file.read()
-        # 移除文件头部的 WEBVTT 声明和空行
-        content = re.sub(r'^(?:\ufeff)?WEBVTT.*(?:\r\n|\r|\n)', '', content, flags=re.IGNORECASE)
-        content = content.strip()
-        blocks = re.split(r'\r?\n\r?\n', content)
-        for block in blocks:
-            lines = block.strip().splitlines()
-            if len(lines) >= 2:
-                # 如果有标识符，跳过第一行
-                if re.match(r'\d+', lines[0]):
-                    time_range = lines[1]
-                    text = ' '.join(lines[2:])
-                else:
-                    time_range = lines[0]
-                    text = ' '.join(lines[1:])
-                if ' --> ' in time_range:
-                    start_time_str, end_time_str = time_range.split(' --> ')
-                    start_time = parse_time(start_time_str)
-                    end_time = parse_time(end_time_str)
-                    subtitles.append((start_time, end_time, text))
-    print(f"Parsed VTT subtitles: {subtitles}")  # 添加这一行
-    return subtitles
-
-# 解析时间格式 (hh:mm:ss.mss) 或 (mm:ss.mss)
-def parse_time(time_str):
-    time_str = time_str.replace(',', '.')  # 替换逗号为点
-    parts = time_str.split(':')
-    if len(parts) == 3:
-        hours, minutes, seconds = parts
-        total_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-    elif len(parts) == 2:
-        minutes, seconds = parts
-        total_seconds = int(minutes) * 60 + float(seconds)
-    else:
-        total_seconds = float(parts[0])
-    return total_seconds
-
-# 定义更新字幕的函数
-def update_subtitles():
-    def update_text_area(text):
-        print(f"Updating original subtitle area with text: {text}")  # 添加这一行
-        text_area.delete(1.0, tk.END)
-        text_area.insert(tk.END, text)
-
-    def update_translated_text_area(translated_text):
-        print(f"Updating translated subtitle area with text: {translated_text}")  # 添加这一行
-        translated_text_area.delete(1.0, tk.END)
-        translated_text_area.insert(tk.END, translated_text)
-
-    while pygame.mixer.music.get_busy() and current_subtitles and not is_closing:
-        if is_paused:
-            time.sleep(0.5)
-            continue
-        current_time = pygame.mixer.music.get_pos() / 1000.0  # 获取当前播放时间，单位为秒
-        print(f"Current playback time: {current_time}")  # 添加这一行
-        for start, end, text in current_subtitles:
-            print(f"Subtitle time range: {start} - {end}, text: {text}")  # 添加这一行
-            if start <= current_time <= end:
-                if not is_closing:
-                    root.after(0, update_text_area, text)
-                # 检查缓存
-                if text in translation_cache:
-                    translated = translation_cache[text]
-                else:
-                    with translator_lock:
-                        try:
-                            translated = translator.translate(text)
-                            translation_cache[text] = translated  # 缓存翻译结果
-                        except Exception as e:
-                            print(f"翻译错误: {e}")
-                            translated = "翻譯失敗"
-                if not is_closing:
-                    root.after(0, update_translated_text_area, translated)
-                break
-        time.sleep(0.5)  # 每隔0.5秒检查一次时间
-
-# 定义更新进度条的函数
-def update_progress_bar():
-    while pygame.mixer.music.get_busy() and not is_closing:
-        if not is_paused:
-            current_time = pygame.mixer.music.get_pos() // 1000  # 获取当前播放时间，转换为秒
-            if not is_closing:
-                root.after(0, progress_bar.config, {"value": current_time})  # 更新进度条
-        time.sleep(1)  # 每秒更新一次
+    fields, texts = [], []
+    for time_fields, text in iter_vtt(file_path):
+        fields.append(time_fields)
+        texts.append(sys.intern(text))  # 重复的台词只保留一份，查缓存时也能先比较指针
+    print(f"Parsed VTT subtitles: {len(texts)} cues")  # 添加这一行
+    # 所有时间一次用 numpy 换算成秒
+    t = np.array(fields, dtype=np.int64).reshape(-1, 8)
+    starts = t[:, 0] * 3600 + t[:, 1] * 60 + t[:, 2] + t[:, 3] / 1000
+    ends = t[:, 4] * 3600 + t[:, 5] * 60 + t[:, 6] + t[:, 7] / 1000
+    order = np.argsort(starts, kind='stable')
+    return starts[order], ends[order], [texts[i] for i in order]
+
+# 按 (路径, 修改时间) 缓存解析结果，上一首/下一首切回来不必重新读取
+@functools.lru_cache(maxsize=256)
+def load_vtt(file_path, mtime):
+    return parse_vtt(file_path)
+
+# 打开文件夹时在线程池里并行预解析所有 .vtt，结果存进 load_vtt 的缓存，换曲时不必再等解析
+parse_pool = ThreadPoolExecutor(max_workers=4)
+preparsed = {}  # .vtt 路径 -> 预解析的 future
+
+def preparse_subtitles(vtt_paths):
+    preparsed.clear()
+    for path in vtt_paths:
+        preparsed[path] = parse_pool.submit(load_vtt, path, os.path.getmtime(path))
+
+# 播放位置：开始或继续播放时以 get_pos() 对齐 monotonic 时钟，之后直接推算，每 5 秒再校正一次
+CLOCK_SYNC_INTERVAL = 5
+play_t0 = 0.0  # 播放位置为 0 时对应的 monotonic 时间
+last_sync = 0.0
+
+def sync_clock():
+    global play_t0, last_sync
+    last_sync = time.monotonic()
+    play_t0 = last_sync - pygame.mixer.music.get_pos() / 1000.0
+
+def playback_position():
+    if time.monotonic() - last_sync >= CLOCK_SYNC_INTERVAL:
+        sync_clock()
+    return time.monotonic() - play_t0
+
+# 播放计时：在 Tk 主循环中执行，更新进度条和当前字幕后睡到下一个整秒或下一句开始，不再用线程轮询
+tick_job = None
+last_cue = -1  # 上一次找到的字幕索引
+last_progress = -1  # 进度条上的秒数，不变时不重绘
+shown_text = shown_translation = None  # 当前界面上的字幕，内容不变时不重绘
+
+# 当前时间所在的字幕索引（尚未开始时为 -1）；多数时候仍在上一句或刚进入下一句，先检查这两句
+def find_cue(starts, t):
+    n = len(starts)
+    for i in (last_cue, last_cue + 1):
+        if 0 <= i < n and starts[i] <= t and (i + 1 == n or t < starts[i + 1]):
+            return i
+    return int(np.searchsorted(starts, t, side='right')) - 1
+
+def tick(subtitles):
+    global tick_job, last_cue, last_progress, shown_text, shown_translation
+    tick_job = None
+    if is_closing or subtitles is not current_subtitles:
+        return
+    if is_paused:
+        tick_job = root.after(250, tick, subtitles)
+        return
+    if not pygame.mixer.music.get_busy():
+        return
+    current_time = playback_position()  # 当前播放时间，单位为秒
+    if int(current_time) != last_progress:
+        last_progress = int(current_time)
+        progress_bar["value"] = last_progress
+    wait = 1 - current_time % 1  # 下一个整秒
+    if subtitles:
+        starts, ends, texts = subtitles
+        i = find_cue(starts, current_time)
+        if i != last_cue:
+            prefetch_translations(texts, i)
+        last_cue = i
+        if i >= 0 and current_time <= ends[i]:
+            text = texts[i]
+            if text != shown_text:
+                shown_text = text
+                text_area.replace(1.0, tk.END, text)
+            # 翻译由 pretranslate 预先填入缓存
+            translated = translation_cache.get(text, "…翻譯中")
+            if translated != shown_translation:
+                shown_translation = translated
+                translated_text_area.replace(1.0, tk.END, translated)
+            if text not in translation_cache:
+                wait = min(wait, 0.5)  # 翻译尚未完成，稍后再更新
+        if i + 1 < len(starts):
+            wait = min(wait, starts[i + 1] - current_time)
+    tick_job = root.after(max(50, int(wait * 1000)), tick, subtitles)
+
+def start_tick():
+    global tick_job, last_cue, last_progress, shown_text, shown_translation
+    if tick_job is not None:
+        root.after_cancel(tick_job)
+    last_cue = -1
+    last_progress = -1
+    shown_text = shown_translation = None
+    sync_clock()
+    tick_job = root.after(0, tick, current_subtitles)
 
 # 定义更新歌曲列表的函数
 def update_song_list():
@@ -172,7 +303,7 @@ def update_song_list():
     for i, file in enumerate(audio_files):
         song_name = os.path.basename(file)
         vtt_file_path = os.path.splitext(file)[0] + ".vtt"
-        if os.path.exists(vtt_file_path):
+        if vtt_file_path in preparsed:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n", 'bold')  # 使用加粗显示
         else:
             song_listbox.insert(tk.END, f"{i + 1}. {song_name}\n")
@@ -180,9 +311,10 @@ def update_song_list():
 
 # 定义播放单个音频文件的函数
 def play_single_file(file_path):
-    global current_subtitles, current_audio_file, current_index, current_duration, is_paused, temp_wav_file
+    global current_subtitles, current_audio_file, current_index, current_duration, is_paused, is_loading
     current_audio_file = file_path
     is_paused = False  # 重置暂停状态
+    is_loading = False
 
     # 清空字幕区域
     def clear_text_areas():
@@ -194,78 +326,116 @@ def play_single_file(file_path):
 
     # 查找与音频文件同名的 .vtt 文件并显示其内容
     vtt_file_path = os.path.splitext(file_path)[0] + ".vtt"
-    current_subtitles = []
+    current_subtitles = None
     if os.path.exists(vtt_file_path):
-        current_subtitles = parse_vtt(vtt_file_path)
+        if vtt_file_path in preparsed:
+            wait_futures([preparsed[vtt_file_path]])  # 还在预解析就等它完成，不重复解析
+        current_subtitles = load_vtt(vtt_file_path, os.path.getmtime(vtt_file_path))
+        threading.Thread(target=pretranslate, args=(current_subtitles,), daemon=True).start()
     else:
         def no_subtitle_message():
             text_area.insert(tk.END, "No associated subtitle file found.")
             translated_text_area.insert(tk.END, "未找到相關的字幕文件。")
         if not is_closing:
             root.after(0, no_subtitle_message)
-    print(f"Loaded subtitles: {current_subtitles}")  # 添加这一行
-
-    # 获取音频文件的时长
-    if file_path.lower().endswith(('.mp3', '.m4a', '.wav')):
-        audio = AudioSegment.from_file(file_path)
-        current_duration = len(audio) // 1000  # 时长以秒为单位
-        progress_bar["maximum"] = current_duration
+    print(f"Loaded subtitles: {len(current_subtitles[2]) if current_subtitles else 0} cues")  # 添加这一行
+
+    # 获取音频文件的时长：只读文件头，不解码整个文件；结果按 (路径, 修改时间) 缓存
+    try:
+        current_duration = duration_ms(file_path, os.path.getmtime(file_path)) // 1000  # 时长以秒为单位
+    except Exception as e:
+        print(f"无法读取时长 {file_path}: {e}")
+        current_duration = 0
+    progress_bar["maximum"] = current_duration
 
     # 播放音频文件
     if file_path.lower().endswith('.mp3') or file_path.lower().endswith('.wav'):
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
-        if current_subtitles:
-            print("Starting subtitle update thread")  # 添加这一行
-            threading.Thread(target=update_subtitles).start()  # 更新字幕
-        threading.Thread(target=update_progress_bar).start()  # 更新进度条
+        pygame.event.clear(MUSIC_END)  # 停掉上一首时也会发出一个
+        start_tick()  # 更新字幕和进度条
     elif file_path.lower().endswith('.m4a'):
         play_m4a(file_path)
 
     highlight_current_song()
 
-# 定义处理 .m4a 文件的函数
+# 所有 .m4a 共用同一个临时 .wav 文件，每次转换直接覆盖，程序退出时才删除
+WAV_SLOT = os.path.join(tempfile.gettempdir(), f'audioplayer_{os.getpid()}.wav')
+
+
+def remove_wav_slot():
+    try:
+        os.remove(WAV_SLOT)
+    except OSError:
+        pass  # 文件不存在或仍被占用时跳过
+
+
+atexit.register(remove_wav_slot)
+
+convert_proc = None  # 当前的 ffmpeg 转换进程
+
+# 定义处理 .m4a 文件的函数：用 ffmpeg 转成 .wav，在后台线程等待，界面不会卡住；转好后回到 Tk 线程播放
 def play_m4a(file_path):
-    global current_subtitles, current_audio_file, current_duration, is_paused, temp_wav_file
+    global current_audio_file, is_paused, is_loading, convert_proc
     current_audio_file = file_path
     is_paused = False  # 重置暂停状态
+    is_loading = True
+    pygame.mixer.music.stop()
+    pygame.mixer.music.unload()  # 释放临时文件才能覆盖
+    if convert_proc is not None and convert_proc.poll() is None:
+        convert_proc.kill()  # 上一个转换已经用不到
+        convert_proc.wait()
+    try:
+        proc = convert_proc = subprocess.Popen(['ffmpeg', '-nostdin', '-v', 'quiet', '-y', '-i', file_path,
+                                                '-acodec', 'pcm_s16le', '-f', 'wav', WAV_SLOT])
+    except OSError as e:
+        print(f"转换失败 {file_path}: {e}")
+        root.after(0, conversion_failed, file_path)
+        return
+    if current_subtitles:
+        root.after(0, text_area.insert, tk.END, "Loading…")
+
+    def convert():
+        ok = proc.wait() == 0
+        if is_closing or proc is not convert_proc:
+            return
+        if ok:
+            root.after(0, play_converted, file_path, proc)
+        else:
+            print(f"转换失败 {file_path}: ffmpeg 返回 {proc.returncode}")
+            root.after(0, conversion_failed, file_path)
+
+    threading.Thread(target=convert, daemon=True).start()
+
+def conversion_failed(file_path):
+    global is_loading
+    if current_audio_file == file_path:
+        is_loading = False
+        if on_music_end is not None:
+            on_music_end()  # 让播放列表继续下一首
+
+def play_converted(file_path, proc):
+    global is_loading
+    if proc is not convert_proc or current_audio_file != file_path:  # 转换期间已切换到别的文件
+        return
+    is_loading = False
+    if current_subtitles:
+        text_area.delete(1.0, tk.END)
 
-    audio = AudioSegment.from_file(file_path)
-    temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_wav_file.close()  # 关闭文件以便其他进程使用
-    audio.export(temp_wav_file.name, format="wav")  # 将 .m4a 文件转换为 .wav
-    current_duration = len(audio) // 1000  # 时长以秒为单位
-    progress_bar["maximum"] = current_duration
-
-    if os.path.exists(temp_wav_file.name):
-        pygame.mixer.music.load(temp_wav_file.name)
-        pygame.mixer.music.play()
-        if current_subtitles:
-            print("Starting subtitle update thread")  # 添加这一行
-            threading.Thread(target=update_subtitles).start()  # 更新字幕
-        threading.Thread(target=update_progress_bar).start()  # 更新进度条
-
-        # 播放结束后删除临时文件
-        def cleanup():
-            global is_closing
-            while True:
-                if is_paused or is_closing:
-                    pygame.time.wait(100)
-                    continue
-                pos = pygame.mixer.music.get_pos()
-                if pos == -1 or is_closing:
-                    break
-                pygame.time.wait(100)
-            pygame.mixer.music.stop()  # 停止音乐播放
-            pygame.mixer.music.unload()  # 卸载音乐，释放文件资源
-            try:
-                os.remove(temp_wav_file.name)  # 删除临时文件
-            except PermissionError:
-                time.sleep(0.1)
-                os.remove(temp_wav_file.name)
-        threading.Thread(target=cleanup).start()
-    else:
-        print(f"无法创建临时文件: {temp_wav_file.name}")
+    pygame.mixer.music.load(WAV_SLOT)
+    pygame.mixer.music.play()
+    pygame.event.clear(MUSIC_END)  # 停掉上一首时也会发出一个
+    start_tick()  # 更新字幕和进度条
+
+# 在 Tk 主循环中取出 pygame 事件；曲目结束时调用 on_music_end
+def pump_pygame_events():
+    if is_closing:
+        return
+    pygame.event.pump()
+    if pygame.event.get(MUSIC_END) and not is_paused and not is_loading:
+        if on_music_end is not None:
+            on_music_end()
+    root.after(50, pump_pygame_events)
 
 # 定义高亮当前歌曲的函数
 def highlight_current_song():
@@ -280,6 +450,7 @@ def pause_music():
     global is_paused
     if is_paused:
         pygame.mixer.music.unpause()  # 恢复播放
+        sync_clock()
         pause_button.config(text="Pause")  # 将按钮文本改回 "Pause"
         is_paused = False
     else:
@@ -314,8 +485,12 @@ def play_directory():
     global audio_files, current_index
     directory_path = filedialog.askdirectory()
     if directory_path:
-        # 获取目录下所有 .mp3、.m4a 和 .wav 文件
-        audio_files = sorted([os.path.join(directory_path, f) for f in os.listdir(directory_path) if f.lower().endswith(('.mp3', '.m4a', '.wav'))])
+        # 获取目录下所有 .mp3、.m4a 和 .wav 文件；同一份文件名集合也用来判断有没有 .vtt
+        with os.scandir(directory_path) as it:
+            names = {e.name for e in it if e.is_file()}
+        audio_files = sorted([os.path.join(directory_path, f) for f in names if f.lower().endswith(('.mp3', '.m4a', '.wav'))])
+        preparse_subtitles([os.path.splitext(f)[0] + ".vtt" for f in audio_files
+                            if os.path.splitext(os.path.basename(f))[0] + ".vtt" in names])
         if audio_files:
             current_index = 0  # 从第一个文件开始播放
             play_audio_files_sequentially(audio_files)
@@ -323,26 +498,15 @@ def play_directory():
 
 # 播放文件夹中的音频文件，按顺序播放
 def play_audio_files_sequentially(audio_files):
+    global on_music_end
     def play_next(index):
         if index < len(audio_files) and not is_closing:
             global current_index
             current_index = index
             file_path = audio_files[index]
             play_single_file(file_path)
-            # 设置事件，在当前文件播放完毕后播放下一个文件
-            def on_music_end():
-                global is_closing
-                while True:
-                    if is_paused or is_closing:
-                        pygame.time.wait(100)
-                        continue
-                    pos = pygame.mixer.music.get_pos()
-                    if pos == -1 or is_closing:
-                        break
-                    pygame.time.wait(100)
-                if not is_closing:
-                    root.after(0, play_next, (index + 1) % len(audio_files))
-            threading.Thread(target=on_music_end).start()
+    # 当前文件播放完毕后播放下一个文件
+    on_music_end = lambda: play_next((current_index + 1) % len(audio_files))
     play_next(0)
 
 # 定义处理歌曲选择的函数
@@ -359,6 +523,13 @@ def close_program():
     global is_closing
     is_closing = True  # 设置标志，表示程序正在关闭
     pygame.mixer.music.stop()  # 停止音乐播放
+    pygame.mixer.music.unload()  # 释放 WAV_SLOT 的文件句柄
+    if convert_proc is not None and convert_proc.poll() is None:
+        convert_proc.kill()
+    prefetch_pool.shutdown(wait=False, cancel_futures=True)
+    parse_pool.shutdown(wait=False, cancel_futures=True)
+    translation_store.close()
+    http_session.close()
     root.destroy()  # 关闭 Tkinter 应用窗口
 
 # 添加控制按钮
@@ -402,4 +573,5 @@ song_listbox.config(yscrollcommand=song_list_scrollbar.set)
 song_list_scrollbar.config(command=song_listbox.yview)
 
 # 运行 Tkinter 应用程序
+root.after(50, pump_pygame_events)
 root.mainloop()
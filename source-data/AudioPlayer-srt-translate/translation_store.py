@@ -0,0 +1,101 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Translations survive restarts here, so replaying a file is instant and
+# works offline
+DB_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'audioplayer', 'translations.sqlite')
+
+# SQLite caps the number of bound parameters per statement
+_SELECT_CHUNK = 500
+
+# Bound on in-memory translations; the oldest unused entries go first
+CACHE_SIZE = 50000
+
+
+def _key(text, target):
+    return hashlib.sha1((text + '\0' + target).encode('utf-8')).digest()
+
+
+# On-disk cache of translated cue texts for one target language. If the
+# database cannot be opened the store stays empty and writes are dropped.
+class TranslationStore:
+    def __init__(self, target, path=DB_PATH):
+        self.target = target
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS t(h BLOB PRIMARY KEY, tr TEXT)')
+        except (OSError, sqlite3.Error) as e:
+            print(f"Translation cache disabled: {e}")
+            self._db = None
+
+    # Stored translations for texts, as {text: translation}
+    def load(self, texts):
+        keys = {_key(text, self.target): text for text in texts}
+        hashes = list(keys)
+        found = {}
+        with self._lock:
+            if self._db is None:
+                return found
+            try:
+                for i in range(0, len(hashes), _SELECT_CHUNK):
+                    chunk = hashes[i:i + _SELECT_CHUNK]
+                    rows = self._db.execute(
+                        f"SELECT h, tr FROM t WHERE h IN ({','.join('?' * len(chunk))})", chunk)
+                    found.update((keys[h], tr) for h, tr in rows)
+            except sqlite3.Error as e:
+                print(f"Failed to read translations: {e}")
+        return found
+
+    # Save successful translations only; one transaction per call
+    def put(self, pairs):
+        rows = [(_key(text, self.target), tr) for text, tr in pairs]
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                with self._db:
+                    self._db.executemany('INSERT OR IGNORE INTO t(h, tr) VALUES (?, ?)', rows)
+            except sqlite3.Error as e:
+                print(f"Failed to save translations: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# In-memory LRU of translated cue texts shared by the UI thread and the
+# translation workers. The lock covers only the dict itself, never a request.
+class TranslationCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, text):
+        with self._lock:
+            return text in self._data
+
+    def get(self, text, default=None):
+        with self._lock:
+            if text not in self._data:
+                return default
+            self._data.move_to_end(text)
+            return self._data[text]
+
+    # Add (text, translation) pairs or a mapping of them
+    def update(self, pairs):
+        if hasattr(pairs, 'items'):
+            pairs = pairs.items()
+        with self._lock:
+            for text, translated in pairs:
+                self._data[text] = translated
+                self._data.move_to_end(text)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
@@ -2,22 +2,36 @@
 
 from __future__ import annotations
 
+import atexit
+import io
 import os
+import shutil
+import subprocess
 import tempfile
-import threading
-import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set
 
 import pygame
-from pydub import AudioSegment
+
+try:
+    import mutagen
+except ImportError:  # optional; ffprobe is used instead
+    mutagen = None
 
 from src.core.subtitle_parser import Subtitle, SubtitleParser
 from src.utils.file_utils import get_auto_srt_file_path, get_srt_file_path, has_srt_file
 
 
+_ffmpeg_path_checked = False
+
+
 def _ensure_ffmpeg_on_path() -> None:
-    """Ensure FFmpeg is discoverable by pydub on Windows."""
+    """Ensure FFmpeg is discoverable by pydub on Windows; called before the first ffmpeg use."""
+    global _ffmpeg_path_checked
+    if _ffmpeg_path_checked:
+        return
+    _ffmpeg_path_checked = True
     if os.name != "nt":
         return
 
@@ -30,7 +44,75 @@ def _ensure_ffmpeg_on_path() -> None:
         os.environ["PATH"] = f"{ffmpeg_bin};{current_path}" if current_path else str(ffmpeg_bin)
 
 
-_ensure_ffmpeg_on_path()
+# Posted by pygame when the music stream finishes
+MUSIC_END = pygame.USEREVENT + 1
+
+
+def _probe_duration(path: str) -> float:
+    """Read the duration in seconds from the container header, without decoding."""
+    if mutagen is not None:
+        try:
+            info = mutagen.File(path)
+            if info is not None and info.info.length:
+                return float(info.info.length)
+        except Exception:
+            pass
+
+    _ensure_ffmpeg_on_path()
+    proc = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="ignore",
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"ffprobe exited with {proc.returncode}")
+    return float(proc.stdout.strip() or 0.0)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Temp files still locked when the player let go of them; removed once at exit
+_pending_deletes: Set[str] = set()
+
+
+@atexit.register
+def _remove_pending_deletes() -> None:
+    for path in _pending_deletes:
+        _remove_quietly(path)
+
+
+def _ffmpeg_wav_bytes(src: str) -> bytes:
+    """Decode src to WAV through an ffmpeg pipe, without touching the disk."""
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", src, "-vn", "-f", "wav", "-"],
+        check=True,
+        capture_output=True,
+    ).stdout
+
+
+def _start_ffmpeg_to_wav(src: str, dst: str) -> subprocess.Popen:
+    """Start decoding src straight to a WAV file with one ffmpeg pass."""
+    return subprocess.Popen(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", src, "-vn", "-f", "wav", dst],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
 
 
 class AudioPlayer:
@@ -48,14 +130,20 @@ class AudioPlayer:
         ".mp4",
     )
     DIRECT_PLAY_FORMATS = {".mp3", ".wav"}
+    # Music playback does not need low latency; a large buffer (~93 ms) avoids underruns under load
+    MIXER_BUFFER = 4096
+    # Upcoming tracks converted to WAV ahead of time; WAVs are large, so keep this small
+    PREPARE_AHEAD = 1
+    # Bounds for the delay tick() suggests until the next subtitle boundary
+    SUBTITLE_WAIT_MIN = 0.05
+    SUBTITLE_WAIT_MAX = 2.0
 
     def __init__(self):
-        pygame.mixer.init()
         self.current_file: Optional[str] = None
         self.playlist: List[str] = []
         self.current_index = -1
         self.current_duration = 0.0
-        self.current_subtitles: List[Subtitle] = []
+        self._subtitles_state = ([], SubtitleParser.build_time_index([]))
         self._subtitle_cache: Dict[str, List[Subtitle]] = {}
 
         self.is_playing = False
@@ -63,16 +151,34 @@ class AudioPlayer:
         self.is_closing = False
         self.volume = 1.0
         self.temp_files: List[str] = []
+        self._active_stream: Optional[io.BytesIO] = None  # In-memory WAV pygame is streaming from
 
         self.on_position_changed: Optional[Callable[[float], None]] = None
         self.on_subtitle_changed: Optional[Callable[[Optional[Subtitle]], None]] = None
         self.on_playback_end: Optional[Callable[[], None]] = None
         self.on_subtitle_needed: Optional[Callable[[str], None]] = None
 
-        self._subtitle_thread: Optional[threading.Thread] = None
-        self._progress_thread: Optional[threading.Thread] = None
+        self._endevent_ready = False
         self._last_subtitle_valid = False
         self._last_subtitle: Optional[Subtitle] = None
+        self._subtitle_cursor = -1
+
+        # Durations and SRT parses for the playlist are warmed in the background
+        self._prefetch = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+        # WAV conversions get their own worker so a burst of probes cannot starve them
+        self._convert = ThreadPoolExecutor(max_workers=1, thread_name_prefix="convert")
+        self._convert_proc: Optional[subprocess.Popen] = None
+        self._duration_cache: Dict[str, Future] = {}
+        self._prepared_wav: Dict[str, Future] = {}
+
+    @property
+    def current_subtitles(self) -> List[Subtitle]:
+        return self._subtitles_state[0]
+
+    @current_subtitles.setter
+    def current_subtitles(self, subtitles: List[Subtitle]) -> None:
+        # List and time index are swapped together so the subtitle thread never sees a mismatched pair
+        self._subtitles_state = (subtitles, SubtitleParser.build_time_index(subtitles))
 
     def has_subtitles(self, audio_path: str) -> bool:
         if audio_path in self._subtitle_cache:
@@ -86,13 +192,14 @@ class AudioPlayer:
             self._last_subtitle_valid = False
 
     def load_file(self, file_path: str) -> bool:
-        if not os.path.exists(file_path):
-            print(f"Audio file not found: {file_path}")
+        if not file_path.lower().endswith(self.SUPPORTED_FORMATS):
+            print(f"Unsupported audio format: {Path(file_path).suffix.lower()}")
             return False
 
-        file_ext = Path(file_path).suffix.lower()
-        if file_ext not in self.SUPPORTED_FORMATS:
-            print(f"Unsupported audio format: {file_ext}")
+        try:
+            os.stat(file_path)
+        except OSError:
+            print(f"Audio file not found: {file_path}")
             return False
 
         self.current_file = file_path
@@ -106,25 +213,31 @@ class AudioPlayer:
                 self.current_subtitles = self._subtitle_cache[file_path]
                 return
 
-            srt_path = get_srt_file_path(file_path)
-            if os.path.exists(srt_path):
-                self.current_subtitles = SubtitleParser.parse_srt(srt_path)
-                return
-
-            auto_srt_path = get_auto_srt_file_path(file_path)
-            if os.path.exists(auto_srt_path):
-                self.current_subtitles = SubtitleParser.parse_srt(auto_srt_path)
-                return
-
-            self.current_subtitles = []
+            self.current_subtitles = self._parse_sidecar(file_path) or []
         except Exception as exc:
             print(f"Failed to load subtitles: {exc}")
             self.current_subtitles = []
 
+    @staticmethod
+    def _parse_sidecar(file_path: str) -> Optional[List[Subtitle]]:
+        """Parse the track's .srt, else its .auto.srt; None when neither exists."""
+        for srt_path in (get_srt_file_path(file_path), get_auto_srt_file_path(file_path)):
+            try:
+                # parse_srt stats the file once, for both the existence check and its cache
+                return SubtitleParser.parse_srt(srt_path)
+            except FileNotFoundError:
+                continue
+        return None
+
     def _load_duration(self, file_path: str) -> None:
         try:
-            audio = AudioSegment.from_file(file_path)
-            self.current_duration = len(audio) / 1000.0
+            future = self._duration_cache.get(file_path)
+            if future is not None and future.done():
+                self.current_duration = future.result()
+                return
+            if future is not None:
+                future.cancel()  # Still queued behind other tracks; probing here is quicker
+            self.current_duration = _probe_duration(file_path)
         except Exception as exc:
             print(f"Failed to read audio duration: {exc}")
             self.current_duration = 0.0
@@ -134,19 +247,10 @@ class AudioPlayer:
         if not target:
             return False
 
-        srt_path = get_srt_file_path(target)
         try:
-            if os.path.exists(srt_path):
-                self.current_subtitles = SubtitleParser.parse_srt(srt_path)
-                return True
-
-            auto_srt_path = get_auto_srt_file_path(target)
-            if os.path.exists(auto_srt_path):
-                self.current_subtitles = SubtitleParser.parse_srt(auto_srt_path)
-                return True
-
-            self.current_subtitles = []
-            return False
+            subtitles = self._parse_sidecar(target)
+            self.current_subtitles = subtitles or []
+            return subtitles is not None
         except Exception as exc:
             print(f"Failed to reload subtitles: {exc}")
             self.current_subtitles = []
@@ -156,11 +260,7 @@ class AudioPlayer:
         if file_path and not self.load_file(file_path):
             return False
 
-        try:
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-        except Exception as exc:
-            print(f"Failed to initialize audio device: {exc}")
+        if not self._ensure_mixer():
             return False
 
         if not self.current_file:
@@ -169,6 +269,7 @@ class AudioPlayer:
 
         self.stop()
         self._last_subtitle_valid = False
+        self._subtitle_cursor = -1
 
         file_ext = Path(self.current_file).suffix.lower()
         try:
@@ -177,33 +278,43 @@ class AudioPlayer:
                 pygame.mixer.music.set_volume(self.volume)
                 pygame.mixer.music.play()
             elif file_ext in self.SUPPORTED_FORMATS:
-                if not self._convert_and_play_with_pydub(file_ext):
+                if not self._convert_and_play(file_ext):
                     return False
             else:
                 print(f"Unsupported audio format: {file_ext}")
                 return False
 
+            if self._endevent_ready:
+                pygame.event.clear(MUSIC_END)  # Halting the previous track posts one too
             self.is_playing = True
             self.is_paused = False
-            self._start_subtitle_thread()
-            self._start_progress_thread()
 
             if not self.current_subtitles and self.current_file and self.on_subtitle_needed:
                 self.on_subtitle_needed(self.current_file)
+            self.prepare_playlist()
             return True
         except Exception as exc:
             print(f"Playback failed: {exc}")
             return False
 
-    def _convert_and_play_with_pydub(self, source_ext: str) -> bool:
+    def _convert_and_play(self, source_ext: str) -> bool:
         try:
-            audio = AudioSegment.from_file(self.current_file)
-            temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_wav_file.close()
-            audio.export(temp_wav_file.name, format="wav")
-            self.temp_files.append(temp_wav_file.name)
+            wav_path = self._take_prepared(self.current_file)
+            if wav_path is not None:
+                self.temp_files.append(wav_path)
+                pygame.mixer.music.load(wav_path)
+            else:
+                _ensure_ffmpeg_on_path()
+                if shutil.which("ffmpeg"):
+                    stream = io.BytesIO(_ffmpeg_wav_bytes(self.current_file))
+                else:
+                    from pydub import AudioSegment
+
+                    stream = io.BytesIO()
+                    AudioSegment.from_file(self.current_file).export(stream, format="wav")
+                    stream.seek(0)
+                self._load_stream(stream)
 
-            pygame.mixer.music.load(temp_wav_file.name)
             pygame.mixer.music.set_volume(self.volume)
             pygame.mixer.music.play()
             return True
@@ -211,6 +322,74 @@ class AudioPlayer:
             print(f"{source_ext} playback conversion failed: {exc}")
             return False
 
+    def _load_stream(self, stream: io.BytesIO) -> None:
+        try:
+            pygame.mixer.music.load(stream, "wav")
+            self._active_stream = stream
+        except pygame.error:
+            # Some SDL builds cannot stream from memory; spill to a temp file
+            temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+            with temp_wav_file:
+                temp_wav_file.write(stream.getbuffer())
+            self.temp_files.append(temp_wav_file.name)
+            pygame.mixer.music.load(temp_wav_file.name)
+
+    def prepare_playlist(self) -> None:
+        """Convert the next PREPARE_AHEAD tracks that need it to WAV in the background."""
+        if not self.playlist or self.is_closing:
+            return
+        _ensure_ffmpeg_on_path()
+        if not shutil.which("ffmpeg"):
+            return
+
+        wanted = set()
+        for step in range(1, self.PREPARE_AHEAD + 1):
+            path = self.playlist[(self.current_index + step) % len(self.playlist)]
+            if path != self.current_file and Path(path).suffix.lower() not in self.DIRECT_PLAY_FORMATS:
+                wanted.add(path)
+
+        for path in list(self._prepared_wav):
+            if path not in wanted:
+                self._discard_prepared(path)
+        for path in wanted:
+            if path not in self._prepared_wav:
+                self._prepared_wav[path] = self._convert.submit(self._prepare_wav, path)
+
+    def _prepare_wav(self, src: str) -> str:
+        temp_wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        temp_wav_file.close()
+        try:
+            if self.is_closing:
+                raise RuntimeError("player is closing")
+            # Keep the handle so cleanup() can kill a conversion that is still running
+            proc = self._convert_proc = _start_ffmpeg_to_wav(src, temp_wav_file.name)
+            _, stderr = proc.communicate()
+            self._convert_proc = None
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args, stderr=stderr)
+        except Exception:
+            _remove_quietly(temp_wav_file.name)
+            raise
+        return temp_wav_file.name
+
+    def _take_prepared(self, path: str) -> Optional[str]:
+        """Return the prepared WAV for path, waiting if its conversion is already running."""
+        future = self._prepared_wav.pop(path, None)
+        if future is None or future.cancel():
+            return None
+        try:
+            return future.result()
+        except Exception as exc:
+            print(f"Background conversion failed, converting again: {exc}")
+            return None
+
+    def _discard_prepared(self, path: str) -> None:
+        future = self._prepared_wav.pop(path)
+        if not future.cancel():
+            future.add_done_callback(
+                lambda f: f.exception() is None and _remove_quietly(f.result())
+            )
+
     def pause(self) -> None:
         if self.is_playing and not self.is_paused:
             pygame.mixer.music.pause()
@@ -231,11 +410,15 @@ class AudioPlayer:
         try:
             if pygame.mixer.get_init():
                 pygame.mixer.music.stop()
+                pygame.mixer.music.unload()  # Releases the temp file handle (Windows locks it)
+            if self._endevent_ready:
+                pygame.event.clear(MUSIC_END)  # An explicit stop is not an end of track
         except Exception:
             pass
 
         self.is_playing = False
         self.is_paused = False
+        self._active_stream = None
         self._cleanup_temp_files()
 
     def get_position(self) -> float:
@@ -246,13 +429,27 @@ class AudioPlayer:
 
     def set_volume(self, volume: float) -> None:
         self.volume = max(0.0, min(1.0, volume))
-        pygame.mixer.music.set_volume(self.volume)
+        if pygame.mixer.get_init():
+            pygame.mixer.music.set_volume(self.volume)
 
     def get_volume(self) -> float:
         return self.volume
 
     def set_playlist(self, file_list: List[str]) -> None:
-        self.playlist = [path for path in file_list if Path(path).suffix.lower() in self.SUPPORTED_FORMATS]
+        self.playlist = [path for path in file_list if path.lower().endswith(self.SUPPORTED_FORMATS)]
+        for path in self.playlist:
+            future = self._duration_cache.get(path)
+            if future is None or future.cancelled():
+                self._duration_cache[path] = self._prefetch.submit(self._preload, path)
+
+    @staticmethod
+    def _preload(file_path: str) -> float:
+        """Parse the track's SRT into the parser cache and return its duration."""
+        try:
+            AudioPlayer._parse_sidecar(file_path)
+        except Exception as exc:
+            print(f"Failed to preload subtitles: {exc}")
+        return _probe_duration(file_path)
 
     def next_track(self) -> bool:
         if not self.playlist:
@@ -272,70 +469,79 @@ class AudioPlayer:
             return self.play(self.playlist[index])
         return False
 
-    def _start_subtitle_thread(self) -> None:
-        if self._subtitle_thread and self._subtitle_thread.is_alive():
-            return
-        self._subtitle_thread = threading.Thread(target=self._update_subtitles, daemon=True)
-        self._subtitle_thread.start()
+    def _ensure_mixer(self) -> bool:
+        """Start the mixer on first playback; its audio thread is not needed before that."""
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=self.MIXER_BUFFER)
+        except Exception as exc:
+            print(f"Failed to initialize audio device: {exc}")
+            return False
+        self._ensure_endevent()
+        return True
 
-    def _start_progress_thread(self) -> None:
-        if self._progress_thread and self._progress_thread.is_alive():
+    def _ensure_endevent(self) -> None:
+        if self._endevent_ready:
             return
-        self._progress_thread = threading.Thread(target=self._update_progress, daemon=True)
-        self._progress_thread.start()
-
-    def _update_subtitles(self) -> None:
-        while self.is_playing and not self.is_closing:
-            if not self.is_paused:
-                current_time = self.get_position()
-                subtitle = SubtitleParser.find_subtitle_by_time(self.current_subtitles, current_time)
-                if self.on_subtitle_changed and (
-                    (not self._last_subtitle_valid) or subtitle != self._last_subtitle
-                ):
-                    self._last_subtitle = subtitle
-                    self._last_subtitle_valid = True
-                    self.on_subtitle_changed(subtitle)
-            time.sleep(0.5)
-
-    def _update_progress(self) -> None:
-        not_busy_ticks = 0
-        loop_started_at = time.time()
-        while self.is_playing and not self.is_closing:
-            position = self.get_position()
-            if not self.is_paused and self.on_position_changed:
-                self.on_position_changed(position)
-
-            if self.is_playing and not self.is_paused:
-                is_busy = pygame.mixer.music.get_busy()
-                if is_busy:
-                    not_busy_ticks = 0
-                else:
-                    startup_grace = (time.time() - loop_started_at) <= 2.0
-                    if startup_grace and position <= 0.2:
-                        not_busy_ticks = 0
-                    else:
-                        not_busy_ticks += 1
-
-                    reached_end = self.current_duration > 0 and position >= (self.current_duration - 0.3)
-                    confirmed_end = not_busy_ticks >= 3
-                    if reached_end or confirmed_end:
-                        self.is_playing = False
-                        if self.on_playback_end:
-                            self.on_playback_end()
-                        break
-
-            time.sleep(0.25)
+        try:
+            pygame.display.init()  # The event queue needs the video subsystem; no window is opened
+            pygame.mixer.music.set_endevent(MUSIC_END)
+            self._endevent_ready = True
+        except Exception as exc:
+            print(f"End-of-track event unavailable, falling back to polling: {exc}")
+
+    def tick(self) -> float:
+        """Push position/subtitle updates and detect end of track; call from the UI timer.
+
+        Returns the seconds until the next subtitle boundary, for scheduling the next call.
+        """
+        if not self.is_playing or self.is_paused or self.is_closing:
+            return self.SUBTITLE_WAIT_MAX
+
+        position = self.get_position()
+        if self.on_position_changed:
+            self.on_position_changed(position)
+        wait = self._update_subtitle(position)
+
+        if self._endevent_ready:
+            ended = bool(pygame.event.get(MUSIC_END))
+        else:
+            ended = not pygame.mixer.music.get_busy()
+        if ended:
+            self.is_playing = False
+            if self.on_playback_end:
+                self.on_playback_end()
+        return wait
+
+    def _update_subtitle(self, current_time: float) -> float:
+        subtitles, index = self._subtitles_state
+        starts, ends, order, _max_ends = index
+        pos = SubtitleParser.locate(starts, current_time, self._subtitle_cursor)
+        self._subtitle_cursor = pos
+        active = SubtitleParser.find_active(index, current_time, pos)
+        subtitle = subtitles[order[active]] if active >= 0 else None
+
+        # Next boundary: the end of the shown cue or the start of the next one, whichever is first
+        deadline = float(ends[active]) if subtitle is not None else float("inf")
+        if pos + 1 < len(starts):
+            deadline = min(deadline, float(starts[pos + 1]))
+        wait = min(max(deadline - current_time, self.SUBTITLE_WAIT_MIN), self.SUBTITLE_WAIT_MAX)
+        if self.on_subtitle_changed and (
+            (not self._last_subtitle_valid) or subtitle is not self._last_subtitle
+        ):
+            self._last_subtitle = subtitle
+            self._last_subtitle_valid = True
+            self.on_subtitle_changed(subtitle)
+        return wait
 
     def _cleanup_temp_files(self) -> None:
         for temp_file in self.temp_files:
             try:
-                if os.path.exists(temp_file):
-                    for _ in range(3):
-                        try:
-                            os.remove(temp_file)
-                            break
-                        except PermissionError:
-                            time.sleep(0.1)
+                os.remove(temp_file)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                _pending_deletes.add(temp_file)
             except Exception as exc:
                 print(f"Failed to clean temp file {temp_file}: {exc}")
         self.temp_files.clear()
@@ -344,4 +550,11 @@ class AudioPlayer:
         self.is_closing = True
         self.stop()
         self._cleanup_temp_files()
+        for path in list(self._prepared_wav):
+            self._discard_prepared(path)
+        self._prefetch.shutdown(wait=False, cancel_futures=True)
+        self._convert.shutdown(wait=False, cancel_futures=True)
+        proc = self._convert_proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
         pygame.mixer.quit()
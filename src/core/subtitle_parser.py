@@ -4,13 +4,38 @@
 """
 
 import os
-from typing import List, Tuple
+import re
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
-from src.utils.time_utils import parse_srt_time
+import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # 可選依賴；沒有時以 NumPy 執行
+    njit = None
 
-@dataclass
+
+# 已解析的字幕：路徑 -> (st_mtime_ns, st_size, 字幕列表)；檔案改動後自動失效
+_SRT_CACHE: Dict[str, Tuple[int, int, List['Subtitle']]] = {}
+
+
+def _locate(starts, current_time, hint):
+    n = len(starts)
+    for i in (hint, hint + 1):
+        if 0 <= i < n and starts[i] <= current_time and (i + 1 == n or starts[i + 1] > current_time):
+            return i
+    return np.searchsorted(starts, current_time, side='right') - 1
+
+
+if njit is not None:
+    try:
+        _locate = njit(cache=True, nogil=True)(_locate)
+    except Exception as e:  # 例如打包後沒有可寫的快取目錄
+        print(f"Numba 不可用，改用 NumPy 查找: {e}")
+
+
+@dataclass(frozen=True, slots=True)
 class Subtitle:
     """字幕數據類"""
     index: int
@@ -22,6 +47,14 @@ class Subtitle:
 class SubtitleParser:
     """字幕解析器類"""
     
+    # 一次匹配整個字幕區塊：序號、起止時間（時、分、秒、1~3 位毫秒，與 parse_srt_time 相同以 /1000 換算）、文字（到空行為止）
+    _SRT_RE = re.compile(
+        r'^\ufeff?[ \t]*(\d+)[ \t]*\r?\n'
+        r'[ \t]*(\d+):(\d\d):(\d\d)[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d\d):(\d\d)[,.](\d{1,3})[^\n]*\n'
+        r'([^\r\n].*?)(?=\r?\n[ \t]*\r?\n|\s*\Z)',
+        re.DOTALL | re.MULTILINE,
+    )
+    
     @staticmethod
     def parse_srt(file_path: str) -> List[Subtitle]:
         """
@@ -31,66 +64,139 @@ class SubtitleParser:
             file_path: SRT 檔案路徑
         
         Returns:
-            字幕對象列表
+            字幕對象列表（與快取共用，修改前請先複製）
         
         Raises:
             FileNotFoundError: 檔案不存在
             UnicodeDecodeError: 編碼錯誤
         """
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"字幕檔案不存在: {file_path}")
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"字幕檔案不存在: {file_path}") from None
+        
+        cached = _SRT_CACHE.get(file_path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
         
         subtitles = []
         
+        # 只讀一次檔案；解碼失敗時用同一份位元組改試其他編碼
+        with open(file_path, 'rb') as file:
+            raw = file.read()
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            content = raw.decode('utf-8-sig')
         except UnicodeDecodeError:
-            # 嘗試使用其他編碼
-            with open(file_path, 'r', encoding='gbk') as file:
-                content = file.read()
-        
-        blocks = content.strip().split('\n\n')
-        
-        for block in blocks:
-            lines = [line.strip() for line in block.split('\n') if line.strip()]
-            
-            if len(lines) >= 3:
-                try:
-                    index = int(lines[0])
-                    time_range = lines[1]
-                    text = ' '.join(lines[2:])
-                    
-                    start_time_str, end_time_str = time_range.split(' --> ')
-                    start_time = parse_srt_time(start_time_str)
-                    end_time = parse_srt_time(end_time_str)
-                    
-                    subtitles.append(Subtitle(
-                        index=index,
-                        start_time=start_time,
-                        end_time=end_time,
-                        text=text
-                    ))
-                except (ValueError, IndexError) as e:
-                    # 跳過格式不正確的區塊
-                    print(f"跳過無效的字幕區塊: {e}")
-                    continue
+            content = raw.decode('gbk')
+        del raw
         
+        # 格式不正確的區塊不會被匹配，直接跳過
+        for m in SubtitleParser._SRT_RE.finditer(content):
+            index, sh, sm, ss, sms, eh, em, es, ems, text = m.groups()
+            text = ' '.join(line.strip() for line in text.splitlines() if line.strip())
+            if not text:
+                continue
+            subtitles.append(Subtitle(
+                index=int(index),
+                start_time=int(sh) * 3600 + int(sm) * 60 + int(ss) + int(sms) / 1000,
+                end_time=int(eh) * 3600 + int(em) * 60 + int(es) + int(ems) / 1000,
+                text=text
+            ))
+        
+        _SRT_CACHE[file_path] = (st.st_mtime_ns, st.st_size, subtitles)
         return subtitles
     
     @staticmethod
-    def find_subtitle_by_time(subtitles: List[Subtitle], current_time: float) -> Subtitle:
+    def build_time_index(
+        subtitles: List[Subtitle],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        建立按開始時間排序的時間索引，供二分查找使用
+        
+        Args:
+            subtitles: 字幕列表（可未排序）
+        
+        Returns:
+            (starts, ends, order, max_ends)：排序後的開始/結束時間、對應回原列表的索引，
+            以及 ends 的前綴最大值（用於處理時間重疊的字幕）
+        """
+        starts = np.fromiter((s.start_time for s in subtitles), dtype=np.float64, count=len(subtitles))
+        ends = np.fromiter((s.end_time for s in subtitles), dtype=np.float64, count=len(subtitles))
+        order = np.argsort(starts, kind='stable')
+        ends = ends[order]
+        max_ends = np.maximum.accumulate(ends) if len(ends) else ends
+        return starts[order], ends, order, max_ends
+    
+    @staticmethod
+    def locate(starts: np.ndarray, current_time: float, hint: int = -1) -> int:
+        """
+        查找最後一個開始時間不晚於 current_time 的位置
+        
+        播放時間單調遞增，先檢查 hint 及其下一個位置，不符合（例如跳轉）才二分查找。
+        
+        Args:
+            starts: 已排序的開始時間
+            current_time: 當前時間（秒）
+            hint: 上次查找的位置
+        
+        Returns:
+            排序後的位置，若在第一句之前則返回 -1
+        """
+        return int(_locate(starts, float(current_time), int(hint)))
+    
+    @staticmethod
+    def find_active(
+        index: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        current_time: float,
+        pos: int,
+    ) -> int:
+        """
+        從 locate 的位置往前找出 current_time 時正在顯示的字幕
+        
+        字幕時間可能重疊（手工製作的 SRT 常見）：較早開始的長字幕在較晚開始的短字幕結束後仍有效。
+        多句同時有效時回傳原列表中最前面的一句，與逐一掃描的結果相同；
+        沒有重疊時只檢查 pos 一個位置。
+        
+        Args:
+            index: build_time_index 的結果
+            current_time: 當前時間（秒）
+            pos: locate 的結果
+        
+        Returns:
+            排序後的位置，沒有正在顯示的字幕則返回 -1
+        """
+        _starts, ends, order, max_ends = index
+        best = -1
+        j = pos
+        while j >= 0 and max_ends[j] >= current_time:
+            if ends[j] >= current_time and (best < 0 or order[j] < order[best]):
+                best = j
+            j -= 1
+        return best
+    
+    @staticmethod
+    def find_subtitle_by_time(
+        subtitles: List[Subtitle],
+        current_time: float,
+        index: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None,
+        hint: int = -1,
+    ) -> Optional[Subtitle]:
         """
         根據當前時間查找對應的字幕
         
         Args:
             subtitles: 字幕列表
             current_time: 當前時間（秒）
+            index: build_time_index 的結果；重複查找時應快取並傳入
+            hint: 上次 locate 的位置
         
         Returns:
             匹配的字幕對象，如果沒有找到則返回 None
         """
-        for subtitle in subtitles:
-            if subtitle.start_time <= current_time <= subtitle.end_time:
-                return subtitle
-        return None
+        if not subtitles:
+            return None
+        if index is None:
+            index = SubtitleParser.build_time_index(subtitles)
+        pos = SubtitleParser.locate(index[0], current_time, hint)
+        i = SubtitleParser.find_active(index, current_time, pos)
+        return subtitles[index[2][i]] if i >= 0 else None
@@ -3,16 +3,21 @@
 使用 Whisper 模型進行音頻轉錄
 """
 
+import gc
+import importlib.util
 import os
 import warnings
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import torch
 import whisper
-from threading import Lock
+from threading import Lock, Thread
 
 from src.core.subtitle_parser import Subtitle
-from src.utils.time_utils import format_time
+from src.utils.time_utils import format_times
+
+# torch.compile 產物的持久快取；預設位置在暫存資料夾，Windows 清理暫存後每次啟動都要重新編譯
+COMPILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "audioplayer", "torchinductor")
 
 
 class Transcriber:
@@ -21,7 +26,10 @@ class Transcriber:
     _instance: Optional['Transcriber'] = None
     _lock = Lock()
     
-    def __new__(cls):
+    # whisper: openai-whisper (PyTorch)；faster_whisper: CTranslate2 INT8 推理
+    BACKENDS = ("whisper", "faster_whisper")
+    
+    def __new__(cls, *args, **kwargs):
         """實現單例模式"""
         if cls._instance is None:
             with cls._lock:
@@ -29,12 +37,25 @@ class Transcriber:
                     cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        """初始化轉錄器"""
+    def __init__(self, backend: Optional[str] = None, compile_model: Optional[bool] = None):
+        """
+        初始化轉錄器
+        
+        Args:
+            backend: 推理後端 ("whisper", "faster_whisper")；faster-whisper 未安裝時退回 whisper
+            compile_model: 在 CUDA 上以 torch.compile 編譯 openai-whisper 的 encoder
+        """
         if hasattr(self, '_initialized'):
+            if backend:
+                self.backend = backend
+            if compile_model is not None:
+                self.compile_model = compile_model
             return
         
-        self._model: Optional[whisper.Whisper] = None
+        self.backend: str = backend or "whisper"
+        self.compile_model: bool = bool(compile_model)
+        self._model: Optional[Any] = None
+        self._model_backend: Optional[str] = None
         self._model_name: Optional[str] = None
         self._device: Optional[str] = None
         self.on_info: Optional[Callable[[str], None]] = None
@@ -44,6 +65,8 @@ class Transcriber:
         self._warned_cuda_disabled: bool = False
         self._warned_cuda_unavailable: bool = False
         self._warned_arch_unsupported: bool = False
+        # (device_preference, _disable_cuda) -> 解析結果；CUDA 探測只需做一次
+        self._resolved_devices: Dict[Tuple[str, bool], str] = {}
         self._initialized = True
 
     @staticmethod
@@ -60,6 +83,7 @@ class Transcriber:
             "cuda initialization error": "CUDA initialization failed",
             "cuda driver initialization failed": "CUDA driver initialization failed",
             "cuda unknown error": "CUDA initialization failed",
+            "is not found or cannot be loaded": "CUDA libraries required by CTranslate2 are missing",
         }
         for hint, reason in reason_map.items():
             if hint in message:
@@ -79,6 +103,9 @@ class Transcriber:
         """
         確定使用的設備（GPU 或 CPU）
         
+        結果依 (設備偏好, 是否已停用 CUDA) 快取，每次轉錄不再重複查詢 CUDA driver；
+        CUDA 因錯誤被停用後鍵值改變，會重新解析一次。
+        
         Args:
             device_preference: 設備偏好 ("auto", "cuda", "cpu")
                 - auto: GPU-first（如果可用則使用 CUDA，否則使用 CPU）
@@ -86,6 +113,16 @@ class Transcriber:
         Returns:
             設備名稱
         """
+        cached = self._resolved_devices.get((device_preference, self._disable_cuda))
+        if cached is not None:
+            return cached
+        device = self._probe_device(device_preference)
+        # 探測過程可能停用 CUDA，以探測後的狀態為鍵
+        self._resolved_devices[(device_preference, self._disable_cuda)] = device
+        return device
+    
+    def _probe_device(self, device_preference: str) -> str:
+        """查詢 CUDA 狀態並決定設備（見 _get_device）"""
         with warnings.catch_warnings():
             # Suppress noisy warnings for unsupported/legacy GPUs on newer torch builds
             warnings.filterwarnings(
@@ -168,6 +205,7 @@ class Transcriber:
                 self._model is not None
                 and self._model_name == model_name
                 and self._device == resolved_device
+                and self._model_backend == self.backend
             ):
                 return  # 模型已載入且設備一致
 
@@ -175,7 +213,7 @@ class Transcriber:
             self._emit_info(f"Loading Whisper model: {model_name}, device: {self._device}")
 
             try:
-                self._model = whisper.load_model(model_name, device=self._device)
+                self._model = self._create_model(model_name, self._device)
                 self._model_name = model_name
                 return
             except Exception as e:
@@ -193,10 +231,101 @@ class Transcriber:
 
                     self._device = "cpu"
                     self._emit_info(f"Loading Whisper model: {model_name}, device: {self._device}")
-                    self._model = whisper.load_model(model_name, device=self._device)
+                    self._model = self._create_model(model_name, self._device)
                     self._model_name = model_name
                     return
                 raise
+
+    def preload(self, model_name: str = "base", device: str = "auto") -> Thread:
+        """
+        在背景執行緒預先載入模型，讓第一次轉錄不必等待權重載入
+        
+        Args:
+            model_name: 模型名稱
+            device: 設備偏好
+        
+        Returns:
+            載入用的 daemon 執行緒
+        """
+        def run() -> None:
+            try:
+                self.load_model(model_name, device)
+            except Exception as exc:
+                self._emit_info(f"[WARN] Model preload failed: {exc}")
+
+        thread = Thread(target=run, name="whisper-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def _create_model(self, model_name: str, device: str) -> Any:
+        """依 backend 建立模型；faster-whisper 不可用時退回 openai-whisper"""
+        if self.backend == "faster_whisper":
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                self._emit_info("[WARN] faster-whisper is not installed; using openai-whisper")
+                self.backend = "whisper"
+            else:
+                compute_type = "int8_float16" if device == "cuda" else "int8"
+                try:
+                    model = WhisperModel(model_name, device=device, compute_type=compute_type)
+                except ValueError as exc:
+                    # 舊 GPU（compute capability < 6.1）不支援 int8_float16，交由 CTranslate2 選擇可用型別
+                    if "compute type" not in str(exc):
+                        raise
+                    self._emit_info(f"[WARN] {compute_type} is not supported on this device; using default compute type")
+                    model = WhisperModel(model_name, device=device, compute_type="default")
+                self._model_backend = "faster_whisper"
+                return model
+
+        model = whisper.load_model(model_name, device=device)
+        self._model_backend = "whisper"
+        if device == "cuda":
+            self._half_weights(model)
+            if self.compile_model:
+                self._compile_encoder(model)
+        return model
+
+    @staticmethod
+    def _half_weights(model: Any) -> None:
+        """
+        將權重轉為 FP16，顯存與權重頻寬減半
+        
+        transcribe(fp16=True) 會把 mel 轉成 FP16，權重同型別即不需每層臨時轉換；
+        LayerNorm 保持 FP32（whisper 以 FP32 計算 LayerNorm）。
+        """
+        model.half()
+        for module in model.modules():
+            if isinstance(module, torch.nn.LayerNorm):
+                module.float()
+
+    def _compile_encoder(self, model: Any) -> None:
+        """
+        以 torch.compile 編譯 encoder 並立即暖機，避免第一次轉錄多等編譯時間
+        
+        encoder 的輸入固定為 30 秒的 mel，形狀不變，以 reduce-overhead 模式擷取 CUDA graph，
+        之後每個視窗只需 replay；decoder 依賴 kv-cache hook 且長度逐 token 增加，無固定形狀
+        可擷取，維持 eager。注意力已由 whisper 走 PyTorch SDPA。
+        
+        編譯結果存於 COMPILE_CACHE_DIR（以圖形、torch 版本與 GPU 為鍵），之後啟動直接重用。
+        """
+        if importlib.util.find_spec("triton") is None:
+            self._emit_info("[WARN] torch.compile needs Triton; running Whisper uncompiled")
+            return
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", COMPILE_CACHE_DIR)
+        os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+        try:
+            compiled = torch.compile(model.encoder, mode="reduce-overhead")
+            mel = torch.zeros(
+                1, model.dims.n_mels, whisper.audio.N_FRAMES, device=model.device, dtype=torch.float16
+            )
+            with torch.no_grad():
+                # 第一次編譯，其後的呼叫才會擷取 graph
+                for _ in range(3):
+                    compiled(mel)
+            model.encoder = compiled
+        except Exception as exc:
+            self._emit_info(f"[WARN] torch.compile failed ({exc}); running Whisper uncompiled")
     
     def transcribe(
         self,
@@ -224,15 +353,70 @@ class Transcriber:
         if self._model is None:
             raise RuntimeError("模型未載入")
         
+        return self._with_cpu_fallback(
+            lambda: self._run_transcribe(audio_path, **transcribe_options), model_name, device
+        )
+
+    def _run_transcribe(self, audio_path: str, **transcribe_options: Any) -> Dict:
+        """以目前載入的模型轉錄，回傳 openai-whisper 格式的結果字典"""
+        if self._model_backend == "faster_whisper":
+            # 產生器需完整走完才會真正轉錄；轉成與 openai-whisper 相同的字典格式
+            segments, info = self._model.transcribe(audio_path, **transcribe_options)
+            segment_dicts = [
+                {"id": segment.id, "start": segment.start, "end": segment.end, "text": segment.text}
+                for segment in segments
+            ]
+            return {
+                "text": "".join(segment["text"] for segment in segment_dicts),
+                "segments": segment_dicts,
+                "language": info.language,
+            }
+    
         # Avoid CPU FP16 warning, and suppress "CPU when CUDA available" noise
         use_fp16 = self._device == "cuda"
+        audio: Any = audio_path
+        if self._device == "cuda":
+            # 先把波形放到 GPU，whisper 的 STFT 與 mel 濾波器矩陣乘法便在 GPU 上執行（濾波器按設備快取）
+            audio = torch.from_numpy(whisper.load_audio(audio_path)).to(self._device)
         with warnings.catch_warnings():
             warnings.filterwarnings(
                 "ignore",
                 message=r"Performing inference on CPU when CUDA is available",
             )
-            result = self._model.transcribe(audio_path, fp16=use_fp16, **transcribe_options)
-        return result
+            return self._model.transcribe(audio, fp16=use_fp16, **transcribe_options)
+
+    def _with_cpu_fallback(self, run: Callable[[], Any], model_name: str, device: str) -> Any:
+        """
+        執行轉錄；CUDA 執行期錯誤（如 CTranslate2 首次推論時才載入的 cuBLAS/cuDNN 缺失）
+        時停用 CUDA，改在 CPU 重新載入模型並重試一次
+        """
+        try:
+            return run()
+        except Exception as exc:
+            reason = self._classify_cuda_error(exc) if self._device == "cuda" else None
+            if not reason:
+                raise
+            self._emit_info(f"[WARN] CUDA inference failed ({reason}); falling back to CPU")
+            self._disable_cuda = True
+        self.load_model(model_name, device)
+        return run()
+
+    def release_cuda_memory(self) -> None:
+        """
+        檔案之間歸還快取的顯存，避免長音檔累積碎片導致 OOM
+        
+        只在檔案邊界（換曲或取消轉錄）呼叫；同一檔案的片段之間保留快取讓配置器重用區塊。
+        faster-whisper 由 CTranslate2 自行管理顯存，torch 的快取與它無關，因此略過。
+        CUDA 錯誤後 synchronize 會再次拋出，此處吞掉以免蓋掉原本的例外。
+        """
+        if self._device != "cuda" or self._model_backend == "faster_whisper":
+            return
+        gc.collect()
+        try:
+            torch.cuda.empty_cache()
+            torch.cuda.synchronize()
+        except Exception:
+            pass
 
     def transcribe_to_subtitles(
         self,
@@ -243,9 +427,13 @@ class Transcriber:
     ) -> List[Subtitle]:
         """轉錄音頻並回傳字幕列表（不寫入檔案）"""
         result = self.transcribe(audio_path, model_name, device, **transcribe_options)
+        return self._segments_to_subtitles(result.get("segments", []))
 
+    @staticmethod
+    def _segments_to_subtitles(segments: Any) -> List[Subtitle]:
+        """將 Whisper 片段字典轉為字幕列表，略過空白片段"""
         subtitles: List[Subtitle] = []
-        for i, segment in enumerate(result.get("segments", []), start=1):
+        for i, segment in enumerate(segments, start=1):
             try:
                 start = float(segment.get("start", 0.0))
                 end = float(segment.get("end", 0.0))
@@ -287,14 +475,18 @@ class Transcriber:
         
         result = self.transcribe(audio_path, model_name, device)
         
+        segments = result["segments"]
+        start_times = format_times(segment["start"] for segment in segments)
+        end_times = format_times(segment["end"] for segment in segments)
+        parts = [
+            f"{i}\n{start_time_str} --> {end_time_str}\n{segment['text'].strip()}\n\n"
+            for i, (segment, start_time_str, end_time_str) in enumerate(
+                zip(segments, start_times, end_times), start=1
+            )
+        ]
+        # 組成完整內容後一次寫入
         with open(output_path, 'w', encoding='utf-8') as srt_file:
-            for i, segment in enumerate(result["segments"], start=1):
-                start = segment["start"]
-                end = segment["end"]
-                text = segment["text"].strip()
-                start_time_str = format_time(start)
-                end_time_str = format_time(end)
-                srt_file.write(f"{i}\n{start_time_str} --> {end_time_str}\n{text}\n\n")
+            srt_file.write("".join(parts))
         
         return output_path
     
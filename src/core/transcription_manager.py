@@ -14,7 +14,7 @@ from src.core.subtitle_parser import Subtitle
 from src.core.transcriber import Transcriber
 from src.utils.config import Config
 from src.utils.file_utils import get_auto_srt_file_path
-from src.utils.time_utils import format_time
+from src.utils.time_utils import format_times
 
 
 class TranscriptionManager:
@@ -44,9 +44,15 @@ class TranscriptionManager:
 
         self._urgent_queue: "queue.Queue[Optional[dict]]" = queue.Queue()
         self._bg_queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        # Extracted chunk WAVs waiting for the model; bounded so ffmpeg stays at most two chunks ahead
+        self._ready_queue: "queue.Queue[Optional[tuple[dict, str]]]" = queue.Queue(maxsize=2)
         self._worker_stop = threading.Event()
+        # Set on track change/cancel; the worker returns cached CUDA memory once it is idle
+        self._release_pending = threading.Event()
+        self._extractor = threading.Thread(target=self._extraction_worker, daemon=True)
         self._worker = threading.Thread(target=self._transcription_worker, daemon=True)
         if start_worker:
+            self._extractor.start()
             self._worker.start()
 
     def start_for_path(self, audio_path: str) -> None:
@@ -86,6 +92,8 @@ class TranscriptionManager:
 
         self._drain_queue(self._urgent_queue)
         self._drain_queue(self._bg_queue)
+        self._drain_ready_queue()
+        self._release_pending.set()
 
     def tick(self) -> None:
         """Schedule additional transcription work while playback is active."""
@@ -156,8 +164,14 @@ class TranscriptionManager:
             self._bg_queue.put_nowait(None)
         except Exception:
             pass
-        if self._worker.is_alive():
-            self._worker.join(timeout=2.0)
+        try:
+            self._ready_queue.put_nowait(None)
+        except Exception:
+            pass
+        for thread in (self._extractor, self._worker):
+            if thread.is_alive():
+                thread.join(timeout=2.0)
+        self._drain_ready_queue()
 
     @staticmethod
     def _drain_queue(q: "queue.Queue[Optional[dict]]") -> None:
@@ -168,6 +182,35 @@ class TranscriptionManager:
             except Exception:
                 break
 
+    def _drain_ready_queue(self) -> None:
+        while True:
+            try:
+                item = self._ready_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                continue
+            job, preview_wav = item
+            path, start_seconds, _seconds, model, generation = self._job_fields(job)
+            self._discard_wav(preview_wav)
+            self._mark_inflight_done(path, start_seconds, model, generation)
+
+    @staticmethod
+    def _discard_wav(preview_wav: str) -> None:
+        try:
+            Path(preview_wav).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def _job_fields(self, job: dict) -> tuple[str, int, int, str, int]:
+        return (
+            str(job.get("path", "")),
+            int(job.get("start", 0)),
+            int(job.get("seconds", 0)),
+            str(job.get("model", self._preview_model_name())),
+            int(job.get("generation", -1)),
+        )
+
     def _preview_model_name(self) -> str:
         return str(self.config.get("subtitle_preview_model", "base"))
 
@@ -204,17 +247,14 @@ class TranscriptionManager:
         else:
             self._bg_queue.put(job)
 
-    def _transcription_worker(self) -> None:
+    def _extraction_worker(self) -> None:
+        """Cut chunk WAVs with ffmpeg while the transcription worker runs the model on earlier ones."""
         while not self._worker_stop.is_set():
             job = self._dequeue_job()
             if job is None:
                 continue
 
-            path = str(job.get("path", ""))
-            start_seconds = int(job.get("start", 0))
-            seconds = int(job.get("seconds", 0))
-            model = str(job.get("model", self._preview_model_name()))
-            generation = int(job.get("generation", -1))
+            path, start_seconds, seconds, model, generation = self._job_fields(job)
 
             if not path or seconds <= 0:
                 self._mark_inflight_done(path, start_seconds, model, generation)
@@ -229,6 +269,41 @@ class TranscriptionManager:
                 self._mark_inflight_done(path, start_seconds, model, generation)
                 continue
 
+            while not self._worker_stop.is_set():
+                try:
+                    self._ready_queue.put((job, preview_wav), timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                self._discard_wav(preview_wav)
+                self._mark_inflight_done(path, start_seconds, model, generation)
+
+    def _transcription_worker(self) -> None:
+        last_path: Optional[str] = None
+        while not self._worker_stop.is_set():
+            try:
+                item = self._ready_queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._release_pending.is_set():
+                    self._release_pending.clear()
+                    self.transcriber.release_cuda_memory()
+                continue
+            if item is None:
+                continue
+
+            job, preview_wav = item
+            path, start_seconds, seconds, model, generation = self._job_fields(job)
+            if last_path is not None and path != last_path:
+                # File boundary: chunks of the same file keep the allocator cache warm
+                self.transcriber.release_cuda_memory()
+            last_path = path
+
+            if self._is_stale_job(path, generation):
+                self._discard_wav(preview_wav)
+                self._mark_inflight_done(path, start_seconds, model, generation)
+                continue
+
             try:
                 kwargs = {
                     "beam_size": self.config.get("whisper_beam_size", 1),
@@ -398,16 +473,18 @@ class TranscriptionManager:
 
     def _write_auto_srt(self, audio_path: str, subtitles: list[Subtitle]) -> None:
         output_path = Path(get_auto_srt_file_path(audio_path))
+        start_times = format_times(subtitle.start_time for subtitle in subtitles)
+        end_times = format_times(subtitle.end_time for subtitle in subtitles)
+        parts = [
+            f"{index}\n{start_time} --> {end_time}\n{subtitle.text.strip()}\n\n"
+            for index, (subtitle, start_time, end_time) in enumerate(
+                zip(subtitles, start_times, end_times), start=1
+            )
+            if subtitle.text.strip()
+        ]
         try:
             with output_path.open("w", encoding="utf-8") as srt_file:
-                for index, subtitle in enumerate(subtitles, start=1):
-                    if not subtitle.text.strip():
-                        continue
-                    srt_file.write(
-                        f"{index}\n"
-                        f"{format_time(subtitle.start_time)} --> {format_time(subtitle.end_time)}\n"
-                        f"{subtitle.text.strip()}\n\n"
-                    )
+                srt_file.write("".join(parts))
         except Exception:
             # Keep subtitle rendering resilient even if persisting the sidecar fails.
             pass
@@ -1,6 +1,6 @@
 """
 應用程式主入口
-注意：建議從專案根目錄運行：python main.py
+注意：建議從專案根目錄運行：python main.py（轉呼叫此模組）
 或使用模組方式：python -m src.main
 """
 
@@ -12,6 +12,13 @@ from pathlib import Path
 # Reduce console noise on startup
 os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 
+# PyTorch reads the allocator config once, when CUDA is first initialised, so set it before
+# anything imports torch (expandable_segments is not supported on Windows)
+os.environ.setdefault(
+    "PYTORCH_CUDA_ALLOC_CONF",
+    "max_split_size_mb:256" if os.name == "nt" else "expandable_segments:True,max_split_size_mb:256",
+)
+
 
 def _ensure_ffmpeg_on_path() -> None:
     """Ensure FFmpeg is discoverable by pydub on Windows."""
@@ -27,9 +34,10 @@ def _ensure_ffmpeg_on_path() -> None:
         os.environ["PATH"] = f"{ffmpeg_bin};{current_path}" if current_path else str(ffmpeg_bin)
 
 
+_ensure_ffmpeg_on_path()
+
 # 如果直接運行此文件，添加專案根目錄到 Python 路徑
-if __name__ == "__main__":
-    _ensure_ffmpeg_on_path()
+if __name__ == "__main__" and not __package__:
     # 獲取專案根目錄（src 的父目錄）
     current_file = Path(__file__).resolve()
     project_root = current_file.parent.parent
@@ -27,6 +27,10 @@ class PlayerControls:
         self.on_close: Optional[Callable[[], None]] = None
         self.on_volume_changed: Optional[Callable[[float], None]] = None
         
+        # 拖曳滑桿每個像素都會觸發；只在整數音量改變時更新，並合併到閒置時一次重繪
+        self._last_volume_int = 100
+        self._pending_after: Optional[str] = None
+        
         # 創建按鈕（使用 Unicode 符號）
         self.play_directory_btn = tk.Button(
             self.frame, 
@@ -94,10 +98,20 @@ class PlayerControls:
     
     def _on_volume_changed(self, value: str) -> None:
         """音量滑桿變更時觸發"""
-        volume = float(value) / 100.0  # 轉換為 0.0-1.0
-        self.volume_value_label.config(text=f"{int(float(value))}%")
+        volume_int = int(float(value))
+        if volume_int == self._last_volume_int:
+            return
+        self._last_volume_int = volume_int
+        if self._pending_after is None:
+            self._pending_after = self.frame.after_idle(self._flush_volume_ui)
+    
+    def _flush_volume_ui(self) -> None:
+        """套用最後一次的音量值（同一輪事件中的多次拖曳只處理一次）"""
+        self._pending_after = None
+        volume_int = self._last_volume_int
+        self.volume_value_label.config(text=f"{volume_int}%")
         if self.on_volume_changed:
-            self.on_volume_changed(volume)
+            self.on_volume_changed(volume_int * 0.01)  # 轉換為 0.0-1.0
     
     def pack(self, **kwargs):
         """打包組件"""
@@ -123,5 +137,6 @@ class PlayerControls:
         Args:
             volume: 音量值（0.0 - 1.0）
         """
+        self._last_volume_int = int(volume * 100)
         self.volume_var.set(volume * 100.0)
-        self.volume_value_label.config(text=f"{int(volume * 100)}%")
+        self.volume_value_label.config(text=f"{self._last_volume_int}%")
@@ -78,20 +78,23 @@ class PlaylistView:
         self._hover_index = None
         self.listbox.delete(1.0, tk.END)
         
+        # 組成 (文字, 標籤, 文字, 標籤, ...) 後以單次 insert 送入 Tk，避免每行一次 Tcl 呼叫
+        chunks: List[object] = []
         for i, file_path in enumerate(self._playlist):
             song_name = os.path.basename(file_path)
-            
-            if self.has_subtitle_func(file_path):
-                self.listbox.insert(tk.END, f"{i + 1}. {song_name}\n", 'bold')
-            else:
-                self.listbox.insert(tk.END, f"{i + 1}. {song_name}\n")
+            chunks.append(f"{i + 1}. {song_name}\n")
+            chunks.append('bold' if self.has_subtitle_func(file_path) else ())
+        if chunks:
+            self.listbox.insert(tk.END, *chunks)
         
         self._highlight_current()
     
     def _highlight_current(self) -> None:
         """高亮當前項目（確保只有一個項目被高亮）"""
-        # 清除所有高亮
-        self.listbox.tag_remove('highlight', '1.0', tk.END)
+        # 清除舊的高亮（只處理已標記的範圍，不掃描整個列表）
+        ranges = self.listbox.tag_ranges('highlight')
+        if ranges:
+            self.listbox.tag_remove('highlight', ranges[0], ranges[-1])
         
         # 只高亮當前播放的項目
         if 0 <= self._current_index < len(self._playlist):
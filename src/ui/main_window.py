@@ -38,7 +38,16 @@ class MainWindow:
         
         # 初始化核心組件
         self.player = AudioPlayer()
-        self.transcriber = Transcriber()
+        self.transcriber = Transcriber(
+            backend=self.config.get("whisper_backend", "faster_whisper"),
+            compile_model=self.config.get("whisper_compile", False),
+        )
+        if self.config.get("auto_transcribe_on_play", True):
+            # 使用者開檔前先把預覽模型載入完成
+            self.transcriber.preload(
+                self.config.get("subtitle_preview_model", "tiny"),
+                self.config.get("device", "auto"),
+            )
         
         # 設置播放器回調
         self.player.on_subtitle_changed = self._on_subtitle_changed
@@ -148,10 +157,13 @@ class MainWindow:
             return
 
         def tick():
+            delay = 500
             try:
+                # Wake early when the next subtitle boundary is closer than the regular interval
+                delay = min(delay, int(self.player.tick() * 1000))
                 self._tick_subtitle_scheduler()
             finally:
-                self._scheduler_job = self.root.after(500, tick)
+                self._scheduler_job = self.root.after(delay, tick)
 
         self._scheduler_job = self.root.after(500, tick)
 
@@ -521,6 +533,7 @@ class MainWindow:
         self._start_rolling_transcription(audio_path)
 
     def _transcription_worker(self) -> None:
+        last_path = ""
         while not self._transcribe_stop.is_set():
             try:
                 job = self._transcribe_queue.get(timeout=0.2)
@@ -560,6 +573,11 @@ class MainWindow:
                 if language and language != "auto":
                     transcribe_kwargs["language"] = language
 
+                if last_path and audio_path != last_path:
+                    # Track changed: return the previous file's cached CUDA memory
+                    self.transcriber.release_cuda_memory()
+                last_path = audio_path
+
                 preview_model = self.config.get("subtitle_preview_model", "tiny")
                 preview_wav = self._make_preview_wav(audio_path, start_seconds, seconds)
                 if not preview_wav:
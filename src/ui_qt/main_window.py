@@ -305,7 +305,10 @@ class MainWindow(QMainWindow):
 
         self.config = Config()
         self.player = AudioPlayer()
-        self.transcriber = Transcriber()
+        self.transcriber = Transcriber(
+            backend=self.config.get("whisper_backend", "faster_whisper"),
+            compile_model=self.config.get("whisper_compile", False),
+        )
         self.rename_service = TrackRenameService()
         self.transcription_manager = TranscriptionManager(self.player, self.transcriber, self.config)
 
@@ -323,6 +326,12 @@ class MainWindow(QMainWindow):
         self.transcription_failed_signal.connect(self._on_transcription_failed)
 
         self.transcriber.on_info = lambda message: self.transcriber_info_signal.emit(message)
+        if self.config.get("auto_transcribe_on_play", True):
+            # 使用者開檔前先把預覽模型載入完成
+            self.transcriber.preload(
+                self.config.get("subtitle_preview_model", "base"),
+                self.config.get("device", "auto"),
+            )
         self.transcription_manager.on_transcription_started = (
             lambda path: self.transcription_started_signal.emit(path)
         )
@@ -969,6 +978,9 @@ class MainWindow(QMainWindow):
         if self._closing_ui or self._loading_folder:
             return
 
+        # Wake early when the next subtitle boundary is closer than the regular interval
+        self._scheduler.setInterval(min(500, int(self.player.tick() * 1000)))
+
         if (
             self._was_playing_track
             and not self.player.is_playing
@@ -24,6 +24,8 @@ class Config:
 
     DEFAULT_CONFIG = {
         "whisper_model": "base",
+        "whisper_backend": "faster_whisper",
+        "whisper_compile": False,
         "device": "auto",
         "whisper_language": "auto",
         "whisper_beam_size": 1,
@@ -4,7 +4,14 @@
 """
 
 import os
-from typing import List, Optional
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# 目錄 -> (目錄 mtime_ns, 目錄中的 SRT 檔名)；新增或刪除檔案會改變目錄 mtime 而失效
+_SRT_INDEX: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+
+# 目錄 mtime 距今不足此時間時不快取，避免同一時間刻度內新增的檔案被舊的索引遮蔽
+_SRT_INDEX_SETTLE_NS = 2_000_000_000
 
 
 def get_srt_file_path(audio_file_path: str) -> str:
@@ -65,6 +72,44 @@ def has_srt_file(audio_file_path: str) -> bool:
     Returns:
         如果存在 SRT 檔案則返回 True
     """
-    srt_path = get_srt_file_path(audio_file_path)
-    auto_srt_path = get_auto_srt_file_path(audio_file_path)
-    return os.path.exists(srt_path) or os.path.exists(auto_srt_path)
+    directory, name = os.path.split(audio_file_path)
+    stem = os.path.normcase(os.path.splitext(name)[0])
+    srt_names = _srt_names_in(directory)
+    return stem + ".srt" in srt_names or stem + ".auto.srt" in srt_names
+
+
+def _srt_names_in(directory: str) -> FrozenSet[str]:
+    """
+    列出目錄中的 SRT 檔名（os.path.normcase 後），依目錄 mtime 快取
+    
+    整個播放列表只需每個目錄掃描一次，之後每個檔案都是集合查詢。
+    
+    Args:
+        directory: 目錄路徑（空字串代表目前目錄）
+    
+    Returns:
+        SRT 檔名集合；目錄無法讀取時為空集合
+    """
+    path = directory or "."
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return frozenset()
+
+    cached = _SRT_INDEX.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    try:
+        with os.scandir(path) as entries:
+            names = frozenset(
+                normalized
+                for normalized in (os.path.normcase(entry.name) for entry in entries)
+                if normalized.endswith(".srt")
+            )
+    except OSError:
+        return frozenset()
+
+    if time.time_ns() - mtime_ns >= _SRT_INDEX_SETTLE_NS:
+        _SRT_INDEX[path] = (mtime_ns, names)
+    return names
@@ -3,7 +3,7 @@
 提供 SRT 時間格式的解析和格式化功能
 """
 
-from typing import Tuple
+from typing import Iterable, List, Tuple
 
 
 def parse_srt_time(time_str: str) -> float:
@@ -45,6 +45,25 @@ def format_time(seconds: float) -> str:
     return f"{hours:02}:{minutes:02}:{secs:02},{milliseconds:03}"
 
 
+def format_times(seconds: Iterable[float]) -> List[str]:
+    """
+    批次將秒數格式化為 SRT 時間格式，結果與逐一呼叫 format_time 相同
+    
+    Args:
+        seconds: 秒數序列
+    
+    Returns:
+        SRT 格式時間字符串列表
+    """
+    formatted = []
+    for value in seconds:
+        hours, rest = divmod(value, 3600)
+        minutes, secs = divmod(rest, 60)
+        milliseconds = int((value % 1) * 1000)
+        formatted.append(f"{int(hours):02}:{int(minutes):02}:{int(secs):02},{milliseconds:03}")
+    return formatted
+
+
 def format_timestamp(seconds: float) -> str:
     """
     將秒數格式化為時間戳格式 (hh:mm:ss)
@@ -0,0 +1,179 @@
+import types
+
+import pytest
+
+from src.core import audio_player as audio_player_module
+from src.core.audio_player import AudioPlayer
+from src.core.subtitle_parser import Subtitle
+
+
+class FakeEventQueue:
+    def __init__(self):
+        self.pending = []
+
+    def post(self, event_type):
+        self.pending.append(event_type)
+
+    def get(self, event_type):
+        matched = [e for e in self.pending if e == event_type]
+        self.pending = [e for e in self.pending if e != event_type]
+        return matched
+
+    def clear(self, event_type):
+        self.get(event_type)
+
+
+class FakeMusic:
+    def __init__(self, events):
+        self.events = events
+        self.endevent = None
+        self.busy = False
+        self.pos_ms = 0
+
+    def load(self, *args):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def set_endevent(self, event_type):
+        self.endevent = event_type
+
+    def play(self):
+        self.busy = True
+
+    def stop(self):
+        # SDL_mixer posts the end event when a playing stream is halted, too
+        if self.busy and self.endevent is not None:
+            self.events.post(self.endevent)
+        self.busy = False
+
+    def unload(self):
+        pass
+
+    def get_busy(self):
+        return self.busy
+
+    def get_pos(self):
+        return self.pos_ms
+
+    def finish(self):
+        self.stop()
+
+
+def build_fake_pygame(display_fails=False):
+    events = FakeEventQueue()
+    music = FakeMusic(events)
+
+    def display_init():
+        if display_fails:
+            raise RuntimeError("video system not available")
+
+    return types.SimpleNamespace(
+        error=RuntimeError,
+        event=events,
+        display=types.SimpleNamespace(init=display_init),
+        mixer=types.SimpleNamespace(get_init=lambda: True, init=lambda **kwargs: None, quit=lambda: None, music=music),
+    )
+
+
+@pytest.fixture
+def make_player(monkeypatch, tmp_path):
+    players = []
+
+    def make(display_fails=False):
+        fake_pygame = build_fake_pygame(display_fails)
+        monkeypatch.setattr(audio_player_module, "pygame", fake_pygame)
+        monkeypatch.setattr(audio_player_module, "_probe_duration", lambda _path: 60.0)
+        player = AudioPlayer()
+        ended = []
+        player.on_playback_end = lambda: ended.append(True)
+        players.append(player)
+        track = tmp_path / "track.wav"
+        track.write_bytes(b"")
+        return player, fake_pygame.mixer.music, ended, str(track)
+
+    yield make
+    for player in players:
+        player.cleanup()
+
+
+def test_end_event_fires_on_playback_end_once(make_player):
+    player, music, ended, track = make_player()
+    assert player.play(track)
+
+    music.finish()
+    player.tick()
+    player.tick()
+
+    assert ended == [True]
+    assert player.is_playing is False
+
+
+def test_explicit_stop_and_replay_are_not_end_of_track(make_player):
+    player, music, ended, track = make_player()
+    assert player.play(track)
+    assert player.play(track)  # Restarting halts the running stream first
+    player.tick()
+
+    player.stop()
+    assert music.events.pending == []  # stop() drops the event its own halt posted
+    assert player.play(track)
+    player.tick()
+
+    assert ended == []
+    assert player.is_playing is True
+
+
+def test_falls_back_to_get_busy_when_display_init_fails(make_player):
+    player, music, ended, track = make_player(display_fails=True)
+    assert player.play(track)
+    assert player._endevent_ready is False
+
+    player.tick()
+    assert ended == []
+
+    music.busy = False
+    player.tick()
+    assert ended == [True]
+
+
+@pytest.mark.parametrize(
+    ("position_ms", "expected_wait"),
+    [
+        (0, AudioPlayer.SUBTITLE_WAIT_MAX),  # Next cue is far away
+        (9990, AudioPlayer.SUBTITLE_WAIT_MIN),  # Boundary is 10 ms ahead
+        (9000, 1.0),
+    ],
+)
+def test_tick_wait_is_clamped_to_subtitle_bounds(make_player, position_ms, expected_wait):
+    player, music, ended, track = make_player()
+    player.set_cached_subtitles(track, [Subtitle(index=1, start_time=10.0, end_time=12.0, text="hi")])
+    assert player.play(track)
+
+    music.pos_ms = position_ms
+
+    assert player.tick() == pytest.approx(expected_wait)
+
+
+def test_locked_temp_files_are_deferred_until_exit(monkeypatch, tmp_path):
+    pending = set()
+    monkeypatch.setattr(audio_player_module, "_pending_deletes", pending)
+    locked = tmp_path / "locked.wav"
+    locked.write_bytes(b"")
+
+    def locked_remove(path):
+        raise PermissionError(path)
+
+    player = AudioPlayer.__new__(AudioPlayer)
+    player.temp_files = [str(locked)]
+    monkeypatch.setattr(audio_player_module.os, "remove", locked_remove)
+    player._cleanup_temp_files()
+    monkeypatch.undo()
+
+    assert pending == {str(locked)}
+    assert player.temp_files == []
+
+    monkeypatch.setattr(audio_player_module, "_pending_deletes", pending)
+    audio_player_module._remove_pending_deletes()
+    assert not locked.exists()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from src.utils.file_utils import find_audio_files, get_auto_srt_file_path, has_srt_file
@@ -28,3 +29,30 @@ def test_has_srt_file_accepts_auto_srt_sidecar(tmp_path):
     auto_srt.write_text("1\n00:00:00,000 --> 00:00:01,000\nhello\n", encoding="utf-8")
 
     assert has_srt_file(str(audio)) is True
+
+
+def test_has_srt_file_scans_each_directory_once_until_it_changes(tmp_path, monkeypatch):
+    tracks = [tmp_path / f"track{i}.mp3" for i in range(3)]
+    for track in tracks:
+        track.write_text("x", encoding="utf-8")
+    (tmp_path / "track1.srt").write_text("", encoding="utf-8")
+    old = 1_000_000_000
+    os.utime(tmp_path, (old, old))
+
+    scans = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        scans.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    assert [has_srt_file(str(track)) for track in tracks] == [False, True, False]
+    assert len(scans) == 1
+
+    (tmp_path / "track2.auto.srt").write_text("", encoding="utf-8")
+    os.utime(tmp_path, (old + 10, old + 10))
+
+    assert [has_srt_file(str(track)) for track in tracks] == [False, True, True]
+    assert len(scans) == 2
@@ -0,0 +1,94 @@
+import os
+import random
+
+import numpy as np
+
+from src.core.subtitle_parser import Subtitle, SubtitleParser
+
+
+def linear_find(subtitles, current_time):
+    for subtitle in subtitles:
+        if subtitle.start_time <= current_time <= subtitle.end_time:
+            return subtitle
+    return None
+
+
+def test_parse_srt_handles_bom_crlf_multiline_and_malformed_blocks(tmp_path):
+    srt = tmp_path / "clip.srt"
+    srt.write_bytes(
+        (
+            "﻿1\r\n00:00:01,000 --> 00:00:02,500\r\nHello\r\n  world  \r\n\r\n"
+            "2\r\nnot a timestamp\r\nskipped\r\n\r\n"
+            "3\r\n00:00:05,5 --> 00:00:06,25\r\nShort millis\r\n\r\n"
+            "4\r\n01:02:03.004 --> 01:02:04.005\r\nLast\r\n"
+        ).encode("utf-8")
+    )
+
+    subtitles = SubtitleParser.parse_srt(str(srt))
+
+    assert subtitles == [
+        Subtitle(index=1, start_time=1.0, end_time=2.5, text="Hello world"),
+        Subtitle(index=3, start_time=5.005, end_time=6.025, text="Short millis"),
+        Subtitle(index=4, start_time=3723.004, end_time=3724.005, text="Last"),
+    ]
+
+
+def test_parse_srt_falls_back_to_gbk(tmp_path):
+    srt = tmp_path / "clip.srt"
+    srt.write_bytes("1\n00:00:00,000 --> 00:00:01,000\n你好\n".encode("gbk"))
+
+    assert [s.text for s in SubtitleParser.parse_srt(str(srt))] == ["你好"]
+
+
+def test_parse_srt_cache_is_invalidated_when_file_changes(tmp_path):
+    srt = tmp_path / "clip.srt"
+    srt.write_text("1\n00:00:00,000 --> 00:00:01,000\nfirst\n", encoding="utf-8")
+
+    first = SubtitleParser.parse_srt(str(srt))
+    assert SubtitleParser.parse_srt(str(srt)) is first
+
+    srt.write_text("1\n00:00:00,000 --> 00:00:01,000\nsecond version\n", encoding="utf-8")
+    os.utime(srt, ns=(1, 1))
+
+    assert [s.text for s in SubtitleParser.parse_srt(str(srt))] == ["second version"]
+
+
+def test_locate_with_hint_matches_searchsorted():
+    rng = random.Random(0)
+    starts = np.sort(np.array([rng.uniform(0, 100) for _ in range(50)]))
+    hint = -1
+    for current_time in sorted(rng.uniform(-5, 105) for _ in range(500)):
+        pos = SubtitleParser.locate(starts, current_time, hint)
+        assert pos == np.searchsorted(starts, current_time, side="right") - 1
+        hint = pos
+    assert SubtitleParser.locate(starts, 50.0, 0) == np.searchsorted(starts, 50.0, side="right") - 1
+
+
+def test_find_subtitle_by_time_keeps_long_overlapping_cue():
+    subtitles = [
+        Subtitle(index=1, start_time=0.0, end_time=10.0, text="long"),
+        Subtitle(index=2, start_time=2.0, end_time=3.0, text="short"),
+        Subtitle(index=3, start_time=12.0, end_time=13.0, text="later"),
+    ]
+    index = SubtitleParser.build_time_index(subtitles)
+
+    assert SubtitleParser.find_subtitle_by_time(subtitles, 2.5, index).text == "long"
+    assert SubtitleParser.find_subtitle_by_time(subtitles, 5.0, index).text == "long"
+    assert SubtitleParser.find_subtitle_by_time(subtitles, 11.0, index) is None
+    assert SubtitleParser.find_subtitle_by_time(subtitles, 12.5, index).text == "later"
+    assert SubtitleParser.find_subtitle_by_time([], 1.0) is None
+
+
+def test_find_subtitle_by_time_matches_linear_scan():
+    rng = random.Random(1)
+    subtitles = []
+    for i in range(200):
+        start = rng.uniform(0, 300)
+        subtitles.append(Subtitle(index=i, start_time=start, end_time=start + rng.uniform(0, 8), text=str(i)))
+    index = SubtitleParser.build_time_index(subtitles)
+
+    for _ in range(2000):
+        current_time = rng.uniform(-1, 310)
+        assert SubtitleParser.find_subtitle_by_time(subtitles, current_time, index) is linear_find(
+            subtitles, current_time
+        )
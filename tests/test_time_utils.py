@@ -0,0 +1,8 @@
+from src.utils.time_utils import format_time, format_times
+
+
+def test_format_times_matches_format_time():
+    values = [0.0, 0.999, 1.001, 59.9999, 61.5, 3599.999, 3600.0, 36000.123, 12.34]
+
+    assert format_times(values) == [format_time(value) for value in values]
+    assert format_times([]) == []
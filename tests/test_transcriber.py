@@ -1,3 +1,8 @@
+import sys
+import types
+
+import pytest
+
 from src.core import transcriber as transcriber_module
 
 
@@ -6,6 +11,38 @@ def build_transcriber():
     return transcriber_module.Transcriber()
 
 
+def no_segments(model, audio_path, **options):
+    return iter([]), types.SimpleNamespace(language="en")
+
+
+@pytest.fixture
+def fake_faster_whisper(monkeypatch, tmp_path):
+    """Install a fake faster_whisper module; returns a factory taking the fake model's behaviour."""
+
+    def install(transcribe=no_segments, device="cpu", on_create=None):
+        transcriber = build_transcriber()
+        transcriber.backend = "faster_whisper"
+        created = []
+
+        class FakeWhisperModel:
+            def __init__(self, model_name, device, compute_type):
+                self.device = device
+                created.append((model_name, device, compute_type))
+                if on_create is not None:
+                    on_create(compute_type)
+
+            def transcribe(self, audio_path, **options):
+                return transcribe(self, audio_path, **options)
+
+        monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisperModel))
+        monkeypatch.setattr(transcriber, "_get_device", lambda _device: "cpu" if transcriber._disable_cuda else device)
+        audio_path = tmp_path / "clip.wav"
+        audio_path.write_bytes(b"")
+        return transcriber, str(audio_path), created
+
+    return install
+
+
 def test_load_model_falls_back_to_cpu_on_cuda_driver_error(monkeypatch):
     transcriber = build_transcriber()
     messages = []
@@ -56,3 +93,134 @@ def test_get_device_falls_back_to_cpu_when_cuda_probe_hits_driver_error(monkeypa
     assert device == "cpu"
     assert transcriber._disable_cuda is True
     assert any("CUDA probe failed" in message for message in messages)
+
+
+def test_faster_whisper_backend_returns_whisper_shaped_result(fake_faster_whisper):
+    def transcribe(model, audio_path, **options):
+        segments = [
+            types.SimpleNamespace(id=0, start=0.0, end=1.5, text=" Hello"),
+            types.SimpleNamespace(id=1, start=1.5, end=3.0, text=" world "),
+        ]
+        return iter(segments), types.SimpleNamespace(language="en")
+
+    transcriber, audio_path, created = fake_faster_whisper(transcribe)
+
+    subtitles = transcriber.transcribe_to_subtitles(audio_path, "base", "auto", beam_size=1)
+
+    assert created == [("base", "cpu", "int8")]
+    assert [(s.start_time, s.end_time, s.text) for s in subtitles] == [(0.0, 1.5, "Hello"), (1.5, 3.0, "world")]
+
+
+def test_release_cuda_memory_empties_torch_cache_for_whisper_backend(monkeypatch):
+    transcriber = build_transcriber()
+    transcriber._device = "cuda"
+    transcriber._model_backend = "whisper"
+    released = []
+
+    monkeypatch.setattr(transcriber_module.torch.cuda, "empty_cache", lambda: released.append("empty"), raising=False)
+    monkeypatch.setattr(transcriber_module.torch.cuda, "synchronize", lambda: released.append("sync"), raising=False)
+
+    transcriber.release_cuda_memory()
+
+    assert released == ["empty", "sync"]
+
+
+def test_transcribe_does_not_release_cuda_cache_between_chunks(monkeypatch, fake_faster_whisper):
+    transcriber, audio_path, _created = fake_faster_whisper(device="cuda")
+    released = []
+    monkeypatch.setattr(transcriber_module.torch.cuda, "empty_cache", lambda: released.append("empty"), raising=False)
+
+    transcriber.transcribe(audio_path)
+    transcriber.release_cuda_memory()
+
+    # Per-chunk calls keep the cache, and CTranslate2 does not use the torch allocator at all
+    assert released == []
+
+
+def test_preload_loads_model_in_background_and_reports_failures(monkeypatch):
+    transcriber = build_transcriber()
+    messages = []
+    transcriber.on_info = messages.append
+    loaded = []
+
+    def fake_load_model(model_name, device):
+        loaded.append((model_name, device))
+        raise RuntimeError("download failed")
+
+    monkeypatch.setattr(transcriber, "load_model", fake_load_model)
+
+    thread = transcriber.preload("tiny", "cpu")
+    thread.join(timeout=5)
+
+    assert thread.daemon
+    assert loaded == [("tiny", "cpu")]
+    assert any("Model preload failed" in message for message in messages)
+
+
+def test_get_device_probes_cuda_once_per_preference(monkeypatch):
+    transcriber = build_transcriber()
+    probes = []
+
+    monkeypatch.setattr(transcriber_module.torch, "__version__", "2.5.1+cu121")
+    monkeypatch.setattr(transcriber_module.torch.cuda, "is_available", lambda: probes.append(True) or True, raising=False)
+    monkeypatch.setattr(transcriber_module.torch.cuda, "get_device_capability", lambda _index: (8, 6), raising=False)
+    monkeypatch.setattr(transcriber_module.torch.cuda, "get_arch_list", lambda: ["sm_86"], raising=False)
+    monkeypatch.setattr(transcriber_module.torch.cuda, "get_device_name", lambda _index: "GPU", raising=False)
+
+    assert transcriber._get_device("auto") == "cuda"
+    assert transcriber._get_device("auto") == "cuda"
+    assert transcriber._get_device("cpu") == "cpu"
+    assert len(probes) == 2
+
+    transcriber._disable_cuda = True
+    assert transcriber._get_device("auto") == "cpu"
+
+
+def test_transcribe_retries_on_cpu_when_ctranslate2_cuda_libraries_are_missing(fake_faster_whisper):
+    def transcribe(model, audio_path, **options):
+        if model.device == "cuda":
+            raise RuntimeError("Library libcublas.so.12 is not found or cannot be loaded")
+        segment = types.SimpleNamespace(id=0, start=0.0, end=1.0, text=" hi")
+        return iter([segment]), types.SimpleNamespace(language="en")
+
+    transcriber, audio_path, created = fake_faster_whisper(transcribe, device="cuda")
+    messages = []
+    transcriber.on_info = messages.append
+
+    subtitles = transcriber.transcribe_to_subtitles(audio_path)
+
+    assert [device for _name, device, _compute_type in created] == ["cuda", "cpu"]
+    assert transcriber._disable_cuda is True
+    assert transcriber.device == "cpu"
+    assert [s.text for s in subtitles] == ["hi"]
+    assert any("falling back to CPU" in message for message in messages)
+
+
+def test_faster_whisper_falls_back_to_default_compute_type_on_legacy_gpu(fake_faster_whisper):
+    def reject_int8_float16(compute_type):
+        if compute_type == "int8_float16":
+            raise ValueError(
+                "Requested int8_float16 compute type, but the target device or backend do not support "
+                "efficient int8_float16 computation."
+            )
+
+    transcriber, _audio_path, created = fake_faster_whisper(device="cuda", on_create=reject_int8_float16)
+
+    transcriber.load_model("base", "auto")
+
+    assert [compute_type for _name, _device, compute_type in created] == ["int8_float16", "default"]
+    assert transcriber.device == "cuda"
+
+
+def test_cuda_cleanup_error_is_swallowed(monkeypatch):
+    transcriber = build_transcriber()
+    transcriber._device = "cuda"
+    transcriber._model_backend = "whisper"
+
+    def failing_synchronize():
+        raise RuntimeError("device-side assert triggered")
+
+    monkeypatch.setattr(transcriber_module.torch.cuda, "empty_cache", lambda: None, raising=False)
+    monkeypatch.setattr(transcriber_module.torch.cuda, "synchronize", failing_synchronize, raising=False)
+
+    transcriber.release_cuda_memory()
@@ -1,3 +1,6 @@
+import threading
+import time
+
 from src.core.subtitle_parser import Subtitle
 from src.core.transcription_manager import TranscriptionManager
 from src.utils.config import Config
@@ -66,3 +69,48 @@ def test_merge_subtitles_replaces_overlapping_upgrade_chunk(tmp_path):
     assert [subtitle.text for subtitle in merged] == ["old 1", "new 2", "keep"]
 
     manager.shutdown()
+
+
+def test_next_chunk_is_extracted_while_current_chunk_transcribes(tmp_path):
+    config = Config(str(tmp_path / "settings.json"))
+    release = threading.Event()
+    extracted = []
+
+    class BlockingTranscriber:
+        def transcribe_to_subtitles(self, preview_wav, **kwargs):
+            release.wait(timeout=5)
+            return [Subtitle(index=1, start_time=0.0, end_time=1.0, text=preview_wav)]
+
+    manager = TranscriptionManager(DummyPlayer(), BlockingTranscriber(), config, start_worker=False)
+
+    def fake_make_preview_wav(path, start_seconds, seconds):
+        wav = tmp_path / f"chunk{start_seconds}.wav"
+        wav.write_bytes(b"")
+        extracted.append(start_seconds)
+        return str(wav)
+
+    manager._make_preview_wav = fake_make_preview_wav
+    manager._write_auto_srt = lambda path, subtitles: None
+    ready = []
+    manager.on_transcription_ready = lambda path, model: ready.append(path)
+
+    for start in (0, 20):
+        manager._enqueue_chunk_job("track.wav", start, 20, "base", generation=0, urgent=True)
+    manager._extractor.start()
+    manager._worker.start()
+
+    for _ in range(50):
+        if extracted == [0, 20]:
+            break
+        time.sleep(0.05)
+    assert extracted == [0, 20]
+    assert ready == []
+
+    release.set()
+    for _ in range(50):
+        if len(ready) == 2:
+            break
+        time.sleep(0.05)
+    assert ready == ["track.wav", "track.wav"]
+
+    manager.shutdown()